@@ -0,0 +1,73 @@
+# benchmark_common.py
+# Utilitários compartilhados pelos benchmarks (benchmark_explainers.py,
+# benchmark_forest.py, benchmark_predictor.py): amostragem de KOIs a partir do
+# CSV de treino, medição de tempo, cabeçalhos de seção e argumentos de linha
+# de comando comuns.
+
+import time
+import argparse
+from typing import Callable, List
+
+import numpy as np
+import pandas as pd
+
+from model_bundle import TARGET_COLUMN
+
+
+def add_data_args(parser: argparse.ArgumentParser, batch_sizes: str,
+                  batch_sizes_help: str = 'Tamanhos de lote separados por vírgula'):
+    """Pacote do modelo, CSV de amostragem, tamanhos de lote e fração de faltantes."""
+    parser.add_argument('--bundle', default='./model_bundle', help='Diretório do pacote do modelo')
+    parser.add_argument(
+        '--training-data',
+        default='./datasets/selected_features_exoplanets.csv',
+        help='CSV de onde as linhas de teste são amostradas'
+    )
+    parser.add_argument('--batch-sizes', type=parse_batch_sizes, default=parse_batch_sizes(batch_sizes),
+                        help=batch_sizes_help)
+    parser.add_argument('--missing-rate', type=float, default=0.1, help='Fração de valores faltantes')
+
+
+def add_parity_args(parser: argparse.ArgumentParser, parity_rows: int, tolerance: float):
+    """Repetições por medida e parâmetros do teste de paridade entre backends."""
+    parser.add_argument('--repeat', type=int, default=3, help='Repetições por medida (usa a melhor)')
+    parser.add_argument('--parity-rows', type=int, default=parity_rows, help='Linhas usadas no teste de paridade')
+    parser.add_argument('--tolerance', type=float, default=tolerance, help='Diferença absoluta máxima aceita')
+
+
+def parse_batch_sizes(text: str) -> List[int]:
+    return [int(size) for size in text.split(',')]
+
+
+def synthetic_rows(training_data_path: str, n_rows: int, missing_rate: float, seed: int) -> pd.DataFrame:
+    """KOIs sintéticos: linhas do CSV de treino (com reposição), sem o alvo, com uma fração de valores apagados (NaN)."""
+    df = pd.read_csv(training_data_path).drop(columns=[TARGET_COLUMN])
+    X = df.sample(n=n_rows, replace=True, random_state=seed).reset_index(drop=True)
+
+    rng = np.random.default_rng(seed)
+    return X.mask(rng.random(X.shape) < missing_rate)
+
+
+def sample_rows(training_data_path: str, schema: dict, n_rows: int, missing_rate: float, seed: int) -> pd.DataFrame:
+    """Linhas do CSV de treino (com reposição) com valores faltantes imputados pela mediana."""
+    X = synthetic_rows(training_data_path, n_rows, missing_rate, seed)
+    return X[schema['feature_names']].fillna(pd.Series(schema['feature_medians']))
+
+
+def timed(func: Callable, *args) -> float:
+    """Segundos de uma chamada."""
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def best_time(func: Callable, *args, repeat: int = 3) -> float:
+    """Melhor tempo (s) de `repeat` chamadas, depois de uma chamada de aquecimento."""
+    func(*args)
+    return min(timed(func, *args) for _ in range(repeat))
+
+
+def print_section(title: str, first: bool = False):
+    print(("" if first else "\n") + "=" * 70)
+    print(title)
+    print("=" * 70)
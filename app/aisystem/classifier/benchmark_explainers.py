@@ -0,0 +1,72 @@
+# benchmark_explainers.py
+# Compara os backends de explicação ('shap' x 'xgboost'): paridade numérica
+# das contribuições, tempo de import e vazão (linhas/s) por tamanho de lote.
+
+import sys
+import argparse
+import subprocess
+import numpy as np
+
+from model_bundle import load_bundle
+from explainers import EXPLAINER_BACKENDS, make_explainer
+from benchmark_common import add_data_args, add_parity_args, best_time, print_section, sample_rows
+
+# Módulo importado por cada backend (medido em um processo novo)
+BACKEND_IMPORTS = {
+    'shap': 'import shap',
+    'xgboost': 'import xgboost',
+}
+
+
+def measure_import_time(statement: str) -> float:
+    """Tempo (s) de um import em um interpretador novo, sem cache de módulos."""
+    code = (
+        "import time; t = time.perf_counter(); "
+        f"{statement}; print(time.perf_counter() - t)"
+    )
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Paridade e desempenho dos backends de explicação'
+    )
+    add_data_args(parser, batch_sizes='1,100,1000')
+    add_parity_args(parser, parity_rows=500, tolerance=1e-4)
+    args = parser.parse_args()
+
+    model, schema = load_bundle(args.bundle)
+
+    print_section("TEMPO DE IMPORT (processo novo)", first=True)
+    for backend, statement in BACKEND_IMPORTS.items():
+        print(f"  {backend:>8}: {measure_import_time(statement):.3f}s  ({statement})")
+
+    explainers = {name: make_explainer(name, model) for name in EXPLAINER_BACKENDS}
+
+    print_section("PARIDADE DAS CONTRIBUIÇÕES")
+    X = sample_rows(args.training_data, schema, args.parity_rows, args.missing_rate, seed=0)
+    reference = explainers['shap'].contributions(X)
+    native = explainers['xgboost'].contributions(X)
+    max_diff = float(np.abs(reference - native).max())
+    parity_ok = reference.shape == native.shape and max_diff <= args.tolerance
+    print(f"  Formato: {reference.shape} x {native.shape}")
+    print(f"  Diferença absoluta máxima: {max_diff:.2e} (tolerância {args.tolerance:.0e})")
+    print(f"  {'✓ OK' if parity_ok else '✗ FALHOU'}")
+
+    print_section("VAZÃO (linhas/s, melhor de %d)" % args.repeat)
+    print(f"  {'lote':>8} " + " ".join(f"{name:>12}" for name in explainers) + f" {'ganho':>8}")
+    for batch_size in args.batch_sizes:
+        X = sample_rows(args.training_data, schema, batch_size, args.missing_rate, seed=batch_size)
+        rates = {}
+        for name, explainer in explainers.items():
+            rates[name] = batch_size / best_time(explainer.contributions, X, repeat=args.repeat)
+        speedup = rates['xgboost'] / rates['shap']
+        print(f"  {batch_size:>8} " + " ".join(f"{rates[name]:>12.1f}" for name in explainers) + f" {speedup:>7.2f}x")
+
+    if not parity_ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# benchmark_forest.py
+# Compara o avaliador da floresta em NumPy (forest_evaluator.py) com o runtime
+# nativo do XGBoost: paridade das probabilidades e vazão (linhas/s) e latência
+# por chamada para lotes de 1 a 100 mil linhas.
+
+import sys
+import time
+import argparse
+import numpy as np
+
+from model_bundle import load_bundle
+from forest_evaluator import ArrayForest
+from benchmark_common import add_data_args, add_parity_args, best_time, print_section, sample_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Paridade e desempenho do avaliador NumPy x XGBoost nativo'
+    )
+    add_data_args(parser, batch_sizes='1,10,100,1000,10000,100000')
+    add_parity_args(parser, parity_rows=5000, tolerance=1e-5)
+    args = parser.parse_args()
+
+    model, schema = load_bundle(args.bundle)
+    booster = model.get_booster()
+
+    start = time.perf_counter()
+    forest = ArrayForest(model)
+    print_section("AVALIADOR NUMPY", first=True)
+    print(f"  Árvores: {forest.n_trees} | Nós: {len(forest.threshold)} | Profundidade: {forest.depth}")
+    print(f"  Construção: {time.perf_counter() - start:.3f}s")
+
+    engines = {
+        'xgboost': lambda X: booster.inplace_predict(X),
+        'numpy': forest.predict_proba,
+    }
+
+    print_section("PARIDADE DAS PROBABILIDADES (com e sem valores faltantes)")
+    X = sample_rows(args.training_data, schema, args.parity_rows, args.missing_rate, seed=0)
+    X_missing = X.mask(np.random.default_rng(0).random(X.shape) < args.missing_rate)
+    max_diff = 0.0
+    same_class = True
+    for frame in (X, X_missing):
+        reference = model.predict_proba(frame)
+        ours = forest.predict_proba(frame)
+        max_diff = max(max_diff, float(np.abs(reference - ours).max()))
+        same_class &= bool((reference.argmax(axis=1) == ours.argmax(axis=1)).all())
+    parity_ok = max_diff <= args.tolerance and same_class
+    print(f"  Diferença absoluta máxima: {max_diff:.2e} (tolerância {args.tolerance:.0e})")
+    print(f"  Mesma classe predita em todas as linhas: {'sim' if same_class else 'não'}")
+    print(f"  {'✓ OK' if parity_ok else '✗ FALHOU'}")
+
+    print_section("VAZÃO (linhas/s) E LATÊNCIA POR CHAMADA (melhor de %d)" % args.repeat)
+    print(f"  {'lote':>8} " + " ".join(f"{name + ' l/s':>14} {'ms':>9}" for name in engines) + f" {'ganho':>8}")
+    for batch_size in args.batch_sizes:
+        X = sample_rows(args.training_data, schema, batch_size, args.missing_rate, seed=batch_size)
+        X = np.ascontiguousarray(X.to_numpy(dtype=np.float32))
+        times = {name: best_time(predict, X, repeat=args.repeat) for name, predict in engines.items()}
+        speedup = times['xgboost'] / times['numpy']
+        print(f"  {batch_size:>8} " + " ".join(
+            f"{batch_size / times[name]:>14.1f} {1000 * times[name]:>9.3f}" for name in engines
+        ) + f" {speedup:>7.2f}x")
+
+    if not parity_ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
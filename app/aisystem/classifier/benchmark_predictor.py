@@ -0,0 +1,236 @@
+# benchmark_predictor.py
+# Micro-benchmarks dos caminhos críticos do ExoplanetPredictor: inicialização,
+# preprocess_input, predict_with_explanation, predict_batch (1 a 100 mil
+# linhas) e generate_summary_report. Os KOIs são sintéticos (amostrados do
+# CSV de treino, com uma fração de valores apagados). Para cada medida:
+# linhas/s, latência p50/p99 e pico de memória (RSS). Os resultados são
+# gravados em JSON e podem ser comparados com uma execução anterior (baseline)
+# para apontar regressões.
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import contextlib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from datetime import datetime, timezone
+from typing import Callable, Dict
+
+from predictor import ExoplanetPredictor
+from benchmark_common import add_data_args, synthetic_rows
+
+
+def _reset_peak_rss() -> bool:
+    """Zera o pico de RSS do processo (Linux: /proc/self/clear_refs). False se não suportado."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    """Pico de RSS (MB) desde o último _reset_peak_rss (ou desde o início do processo)."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss: KB no Linux, bytes no macOS; não pode ser zerado
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def measure(func: Callable[[], object], rows: int, min_runs: int, min_time: float,
+            max_runs: int = 1000) -> Dict:
+    """
+    Executa `func` pelo menos `min_runs` vezes e até somar `min_time` segundos.
+
+    Args:
+        func: Chamada medida (sem argumentos)
+        rows: Linhas processadas por chamada (para linhas/s)
+        min_runs: Mínimo de execuções
+        min_time: Tempo mínimo total (s)
+        max_runs: Máximo de execuções
+
+    Returns:
+        Dicionário com execuções, p50/p99/média (ms), linhas/s e pico de RSS (MB)
+    """
+    _reset_peak_rss()
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < min_runs or (time.perf_counter() - started < min_time and len(timings) < max_runs):
+        start = time.perf_counter()
+        # predict_batch imprime o progresso; não poluir a saída do benchmark
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        timings.append(time.perf_counter() - start)
+
+    timings = np.array(timings)
+    return {
+        'rows': rows,
+        'runs': len(timings),
+        'p50_ms': float(np.percentile(timings, 50) * 1000),
+        'p99_ms': float(np.percentile(timings, 99) * 1000),
+        'mean_ms': float(timings.mean() * 1000),
+        'rows_per_s': float(rows * len(timings) / timings.sum()),
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+
+def run_benchmarks(args) -> Dict:
+    """Roda todas as medidas e devolve o documento JSON (meta + benchmarks)."""
+    results = {}
+
+    def record(name, result):
+        results[name] = result
+        print(f"  {name:<28} {result['runs']:>5} {result['p50_ms']:>11.3f} {result['p99_ms']:>11.3f} "
+              f"{result['rows_per_s']:>12.1f} {result['peak_rss_mb']:>9.1f}")
+
+    print("=" * 84)
+    print(f"  {'benchmark':<28} {'exec.':>5} {'p50 (ms)':>11} {'p99 (ms)':>11} {'linhas/s':>12} {'RSS (MB)':>9}")
+    print("=" * 84)
+
+    record('init', measure(lambda: ExoplanetPredictor(args.bundle),
+                           1, args.min_runs, args.min_time, max_runs=20))
+
+    predictor = ExoplanetPredictor(args.bundle)
+    # Import do shap e criação do explicador fora das medidas (custo de partida, não do caminho quente)
+    predictor.warm_up()
+    sample = synthetic_rows(args.training_data, 1000, args.missing_rate, args.seed)
+    # Dicionários como os enviados pela API (None para faltantes)
+    records = [
+        {key: (None if pd.isna(value) else value) for key, value in row.items()}
+        for row in sample.to_dict(orient='records')
+    ]
+    cursor = iter(range(10 ** 9))
+
+    def next_record():
+        return records[next(cursor) % len(records)]
+
+    record('preprocess_input', measure(lambda: predictor.preprocess_input(next_record()),
+                                       1, args.min_runs, args.min_time))
+    record('predict_with_explanation', measure(lambda: predictor.predict_with_explanation(next_record()),
+                                               1, args.min_runs, args.min_time))
+
+    # O relatório é medido sobre o resultado do maior lote de até 10 mil linhas
+    report_size = max([b for b in args.batch_sizes if b <= 10_000], default=min(args.batch_sizes))
+    report_input = None
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for batch_size in args.batch_sizes:
+            path = os.path.join(tmpdir, f'koi_{batch_size}.csv')
+            synthetic_rows(args.training_data, batch_size, args.missing_rate, args.seed + batch_size) \
+                .to_csv(path, index=False)
+
+            def run_batch():
+                return predictor.predict_batch(path, explanation=args.explanation)
+
+            record(f'predict_batch_{batch_size}',
+                   measure(run_batch, batch_size, args.min_runs, args.min_time))
+            if batch_size == report_size:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    report_input = run_batch()
+
+    record('generate_summary_report', measure(lambda: predictor.generate_summary_report(report_input),
+                                              len(report_input), args.min_runs, args.min_time))
+
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'xgboost': xgb.__version__,
+            'model_version': predictor.model_version,
+            'missing_rate': args.missing_rate,
+            'explanation': args.explanation,
+            'seed': args.seed,
+        },
+        'benchmarks': results,
+    }
+
+
+def compare_with_baseline(current: Dict, baseline: Dict, threshold: float, rss_floor_mb: float = 10.0) -> list:
+    """
+    Compara p50 e pico de RSS com o baseline.
+
+    Args:
+        current: Documento desta execução
+        baseline: Documento de uma execução anterior
+        threshold: Piora relativa tolerada (0.10 = 10%)
+        rss_floor_mb: Aumentos de RSS menores que isso (MB) são ignorados; o
+            pico inclui a memória já ocupada pelas medidas anteriores
+
+    Returns:
+        Lista com os nomes das medidas que regrediram
+    """
+    regressions = []
+    print("\n" + "=" * 84)
+    print(f"COMPARAÇÃO COM O BASELINE ({baseline['meta'].get('timestamp', '?')}, tolerância {threshold:.0%})")
+    print("=" * 84)
+    print(f"  {'benchmark':<28} {'p50 base':>10} {'p50 atual':>10} {'Δ p50':>8} {'Δ RSS':>8}")
+    for name, result in current['benchmarks'].items():
+        base = baseline['benchmarks'].get(name)
+        if base is None:
+            print(f"  {name:<28} {'(sem baseline)':>38}")
+            continue
+        time_change = result['p50_ms'] / base['p50_ms'] - 1
+        rss_change = result['peak_rss_mb'] / base['peak_rss_mb'] - 1
+        rss_regressed = rss_change > threshold and result['peak_rss_mb'] - base['peak_rss_mb'] > rss_floor_mb
+        regressed = time_change > threshold or rss_regressed
+        if regressed:
+            regressions.append(name)
+        print(f"  {name:<28} {base['p50_ms']:>10.3f} {result['p50_ms']:>10.3f} "
+              f"{time_change:>+8.1%} {rss_change:>+8.1%}  {'✗ REGRESSÃO' if regressed else '✓'}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Micro-benchmarks do preditor (latência, vazão e memória)'
+    )
+    add_data_args(parser, batch_sizes='1,100,10000,100000',
+                  batch_sizes_help='Tamanhos de lote do predict_batch, separados por vírgula')
+    parser.add_argument(
+        '--explanation', choices=['none', 'topk', 'full'], default='none',
+        help="Explicação no predict_batch (padrão: none; o SHAP exato de 100 mil linhas leva minutos)"
+    )
+    parser.add_argument('--min-runs', type=int, default=3, help='Mínimo de execuções por medida')
+    parser.add_argument('--min-time', type=float, default=1.0, help='Tempo mínimo (s) por medida')
+    parser.add_argument('--seed', type=int, default=0, help='Semente da amostragem')
+    parser.add_argument('--output', default='benchmark_results.json', help='Arquivo JSON com os resultados')
+    parser.add_argument('--baseline', help='JSON de uma execução anterior para comparar')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Piora relativa (p50 ou RSS) considerada regressão')
+    args = parser.parse_args()
+
+    current = run_benchmarks(args)
+
+    with open(args.output, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f"\nResultados salvos em: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(current, baseline, args.threshold)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regressão(ões): {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✓ Nenhuma regressão")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# benchmark_threads.py
+# Compara layouts de paralelismo na avaliação por validação cruzada do
+# XGBoost (a carga do gridsearchboost.py): o padrão anterior (GridSearchCV
+# com n_jobs=-1 e cada XGBClassifier com as threads padrão), N tarefas × N
+# threads (oversubscription explícita), só threads do XGBoost e o layout
+# escolhido por thread_budget.plan_threads. Mesmo conjunto de candidatos e
+# folds em todos; mede o tempo total e o ganho sobre o padrão anterior.
+
+import json
+import time
+import argparse
+import warnings
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.model_selection import StratifiedKFold, GridSearchCV, ParameterSampler
+
+from thread_budget import ThreadPlan, available_cpus, plan_threads
+from xgb_search import FoldEvaluator
+
+
+def time_layout(evaluator: FoldEvaluator, candidates, rounds: int, plan: ThreadPlan):
+    """Segundos para avaliar todos os (candidato, fold) com o layout dado, e as notas."""
+    tasks = [(params, fold) for params in candidates for fold in range(len(evaluator.folds))]
+    evaluator._prepare(1.0)
+    start = time.perf_counter()
+    scores = evaluator._parallel_map(
+        lambda task: evaluator.evaluate_fold(task[0], [rounds], task[1], threads=plan.inner)[rounds],
+        tasks, plan
+    )
+    return time.perf_counter() - start, scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Layouts de threads da busca de hiperparâmetros do XGBoost')
+    parser.add_argument('--training-data', default='./datasets/selected_features_exoplanets.csv',
+                        help='CSV de treino (o mesmo do gridsearchboost.py)')
+    parser.add_argument('--cpus', type=int, default=available_cpus(), help='Orçamento de núcleos')
+    parser.add_argument('--candidates', type=int, default=8, help='Candidatos sorteados da grade rápida')
+    parser.add_argument('--rounds', type=int, default=100, help='Árvores por treino')
+    parser.add_argument('--folds', type=int, default=5, help='Folds da validação cruzada')
+    parser.add_argument('--output', help='Arquivo JSON com os resultados (opcional)')
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    df = pd.read_csv(args.training_data)
+    X = df.drop(columns=["koi_disposition_num"])
+    y = df["koi_disposition_num"].astype(int).values
+    skf = StratifiedKFold(n_splits=args.folds, shuffle=True, random_state=0)
+    clf = xgb.XGBClassifier(random_state=0, eval_metric='mlogloss', tree_method='hist')
+    space = {
+        "max_depth": [5, 7, 9],
+        "learning_rate": [0.05, 0.1, 0.2],
+        "subsample": [0.8, 1.0],
+        "colsample_bytree": [0.8, 1.0],
+        "min_child_weight": [1, 3],
+    }
+    candidates = list(ParameterSampler(space, args.candidates, random_state=0))
+    n_tasks = len(candidates) * args.folds
+
+    print("=" * 78)
+    print(f"LAYOUTS DE THREADS: {len(candidates)} candidatos × {args.folds} folds, "
+          f"{args.rounds} árvores, {args.cpus} núcleos")
+    print("=" * 78)
+
+    results = {}
+
+    # Padrão anterior: processos do GridSearchCV × threads padrão do XGBoost
+    grid = GridSearchCV(clf.set_params(n_estimators=args.rounds),
+                        param_grid=[{key: [value] for key, value in params.items()} for params in candidates],
+                        scoring="f1_weighted", cv=skf, n_jobs=-1, refit=False)
+    start = time.perf_counter()
+    grid.fit(X, y)
+    results['gridsearchcv_n_jobs=-1'] = {'seconds': time.perf_counter() - start, 'outer': -1, 'inner': 'padrão'}
+
+    evaluator = FoldEvaluator(X, y, skf.split(X, y), clf.get_params(), cpus=args.cpus)
+    planned = plan_threads(n_tasks, args.cpus)
+    layouts = {
+        'oversubscribed': ThreadPlan(args.cpus, args.cpus, args.cpus),
+        'inner_only': ThreadPlan(args.cpus, 1, args.cpus),
+        'planned': planned,
+    }
+    reference = None
+    for name, plan in layouts.items():
+        seconds, scores = time_layout(evaluator, candidates, args.rounds, plan)
+        reference = scores if reference is None else reference
+        results[name] = {
+            'seconds': seconds, 'outer': plan.outer, 'inner': plan.inner,
+            'max_score_diff': float(np.max(np.abs(np.array(scores) - np.array(reference)))),
+        }
+
+    baseline = results['gridsearchcv_n_jobs=-1']['seconds']
+    print(f"  {'layout':<24} {'tarefas':>8} {'threads':>8} {'tempo (s)':>10} {'ganho':>7}")
+    for name, result in results.items():
+        print(f"  {name:<24} {result['outer']:>8} {result['inner']:>8} {result['seconds']:>10.2f} "
+              f"{baseline / result['seconds']:>6.2f}x")
+    print(f"\nLayout escolhido: {planned.describe()}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'cpus': args.cpus, 'tasks': n_tasks, 'rounds': args.rounds, 'layouts': results}, f, indent=2)
+        print(f"Resultados salvos em: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
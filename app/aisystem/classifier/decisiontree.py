@@ -1,6 +1,7 @@
 
 import os
 import pandas as pd
+from thread_budget import available_cpus, plan_threads, thread_layout, log_plan
 from sklearn.model_selection import StratifiedKFold, cross_validate, cross_val_predict
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.metrics import classification_report, confusion_matrix
@@ -9,6 +10,7 @@ from sklearn.impute import SimpleImputer
 csv_path = "./datasets/selected_features_exoplanets.csv"  # ajuste se necessário
 k = 6
 random_state = 0
+cpus = available_cpus()  # núcleos usados na validação cruzada; ajuste se necessário
 out_importances = "./datasets/decision_tree_feature_importances_top20.csv"
 out_preds = "./datasets/decision_tree_crossval_predictions.csv"
 
@@ -43,9 +45,15 @@ clf = DecisionTreeClassifier(random_state=random_state,
                              # you can set max_depth to avoid overfitting (ex.: max_depth=6)
                              )
 
+# Um fold por processo (a árvore usa uma thread só; OpenMP/BLAS limitados a 1)
+plan = plan_threads(k, cpus, inner_parallel=False)
+log_plan(plan, "validação cruzada")
+
 # 5) métricas por cross-validate
 scoring = ['accuracy', 'precision_weighted', 'recall_weighted', 'f1_weighted']
-cv_results = cross_validate(clf, X_final, y, cv=skf, scoring=scoring, return_train_score=False)
+with thread_layout(plan):
+    cv_results = cross_validate(clf, X_final, y, cv=skf, scoring=scoring, return_train_score=False,
+                                n_jobs=plan.outer)
 
 # Resumo métricas
 for metric in scoring:
@@ -54,7 +62,8 @@ for metric in scoring:
 
 # 6) predições agregadas via cross_val_predict (útil para relatório e matriz de confusão)
 from sklearn.model_selection import cross_val_predict
-y_pred = cross_val_predict(clf, X_final, y, cv=skf)
+with thread_layout(plan):
+    y_pred = cross_val_predict(clf, X_final, y, cv=skf, n_jobs=plan.outer)
 
 print("\nClassification report (agreg. cross-val predictions):")
 print(classification_report(y, y_pred, target_names=["FALSE POS (0)","CANDIDATE (1)","CONFIRMED (2)"], digits=4))
@@ -14,6 +14,8 @@ def main():
         python exoplanet_predictor.py input.csv output.csv
         python exoplanet_predictor.py input.xlsx output.xlsx
         python exoplanet_predictor.py input.csv output.csv --report
+        python exoplanet_predictor.py input.csv output.parquet --stream
+        python exoplanet_predictor.py input.parquet output.arrow --stream
     """
     
     parser = argparse.ArgumentParser(
@@ -21,21 +23,16 @@ def main():
     )
     parser.add_argument(
         'input_file',
-        help='Arquivo de entrada (CSV ou Excel) com dados dos exoplanetas'
+        help='Arquivo de entrada (CSV, Excel, Parquet ou Arrow IPC/Feather) com dados dos exoplanetas'
     )
     parser.add_argument(
         'output_file',
-        help='Arquivo de saída para salvar resultados'
+        help='Arquivo de saída (.csv, .xlsx, .parquet ou .arrow/.feather)'
     )
     parser.add_argument(
-        '--model',
-        default='xgboost_grid_best_model1.joblib',
-        help='Caminho para o modelo treinado'
-    )
-    parser.add_argument(
-        '--training-data',
-        default='./datasets/selected_features_exoplanets.csv',
-        help='Caminho para dados de treinamento'
+        '--bundle',
+        default='./model_bundle',
+        help='Diretório do pacote do modelo (gerado por model_bundle.py)'
     )
     parser.add_argument(
         '--report',
@@ -47,6 +44,63 @@ def main():
         default='batch_report.txt',
         help='Arquivo para salvar o relatório'
     )
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Processar em blocos com memória constante (saída CSV, Parquet ou Arrow IPC)'
+    )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=50_000,
+        help='Linhas por bloco no modo --stream'
+    )
+    parser.add_argument(
+        '--features-only',
+        action='store_true',
+        help='No modo --stream, ler só as colunas de features do modelo (sem repetir as demais na saída)'
+    )
+    parser.add_argument(
+        '--explanation',
+        choices=['none', 'topk', 'full'],
+        default='topk',
+        help="Nível de explicação: 'none' (só predição), 'topk' ou 'full' (todas as features)"
+    )
+    parser.add_argument(
+        '--top-k',
+        type=int,
+        default=3,
+        help='Features mais importantes por linha no modo topk'
+    )
+    parser.add_argument(
+        '--explainer',
+        choices=['shap', 'xgboost'],
+        default='shap',
+        help="Backend das contribuições SHAP: 'shap' ou 'xgboost' (nativo, sem importar shap)"
+    )
+    parser.add_argument(
+        '--inference',
+        choices=['xgboost', 'numpy'],
+        default='xgboost',
+        help="Cálculo das probabilidades: 'xgboost' (nativo) ou 'numpy' (árvores em arrays, sem o runtime do XGBoost)"
+    )
+    parser.add_argument(
+        '--cache-size',
+        type=int,
+        default=100_000,
+        help='Linhas no cache LRU de predições (0 = desativado)'
+    )
+    parser.add_argument(
+        '--cache-path',
+        default=None,
+        help='Arquivo SQLite para o cache em disco (reaproveitado entre execuções)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Processos para classificar em paralelo (ex.: número de núcleos)'
+    )
     
     args = parser.parse_args()
     
@@ -55,22 +109,40 @@ def main():
     print("="*70)
     print(f"\n Arquivo de entrada: {args.input_file}")
     print(f" Arquivo de saída: {args.output_file}")
-    print(f" Modelo: {args.model}\n")
+    print(f" Modelo: {args.bundle}\n")
     
+    predictor = None
     try:
         # Inicializar preditor
         print("Carregando modelo...")
         predictor = ExoplanetPredictor(
-            model_path=args.model,
-            training_data_path=args.training_data
+            bundle_path=args.bundle,
+            n_workers=args.workers,
+            explainer_backend=args.explainer,
+            inference_backend=args.inference,
+            cache_size=args.cache_size,
+            cache_path=args.cache_path
         )
         print(" Modelo carregado com sucesso!\n")
         
         # Processar em lote
-        results_df = predictor.predict_batch(
-            input_file=args.input_file,
-            output_file=args.output_file
-        )
+        if args.stream:
+            stats = predictor.predict_batch_streaming(
+                input_file=args.input_file,
+                output_file=args.output_file,
+                chunksize=args.chunk_size,
+                explanation=args.explanation,
+                top_k=args.top_k,
+                features_only=args.features_only
+            )
+        else:
+            results_df = predictor.predict_batch(
+                input_file=args.input_file,
+                output_file=args.output_file,
+                explanation=args.explanation,
+                top_k=args.top_k
+            )
+            stats = predictor.summarize_results(results_df)
         
         # Gerar relatório se solicitado
         if args.report:
@@ -78,7 +150,7 @@ def main():
             print("GERANDO RELATÓRIO")
             print("="*70)
             
-            report = predictor.generate_summary_report(results_df)
+            report = predictor.format_summary_report(stats)
             print(report)
             
             # Salvar relatório em arquivo
@@ -90,10 +162,15 @@ def main():
         print("\n" + "="*70)
         print("RESUMO RÁPIDO")
         print("="*70)
-        counts = results_df['prediction_label'].value_counts()
-        for label, count in counts.items():
+        for label, count in stats['label_counts'].most_common():
             print(f"{label}: {count}")
         
+        # Com --workers, inclui os contadores dos processos do pool
+        cache = predictor.cache_stats()
+        print(f"\nLinhas duplicadas reaproveitadas: {cache['deduplicated_rows']}")
+        if cache.get('enabled', True):
+            print(f"Cache: {cache['hits'] + cache['disk_hits']} acertos | {cache['misses']} falhas")
+        
         print("\n Processamento concluído com sucesso!")
         
     except FileNotFoundError as e:
@@ -104,6 +181,10 @@ def main():
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        # Libera o pool de processos e o cache em disco também em caso de erro
+        if predictor is not None:
+            predictor.close()
 
 
 # ============================================================================
@@ -120,11 +201,33 @@ python exoplanet_predictor.py meus_exoplanetas.xlsx resultados.xlsx
 # 3. Processar com relatório
 python exoplanet_predictor.py meus_exoplanetas.csv resultados.csv --report
 
-# 4. Especificar modelo customizado
-python exoplanet_predictor.py input.csv output.csv --model meu_modelo.joblib
+# 4. Especificar modelo customizado (gere o pacote antes com model_bundle.py)
+python model_bundle.py --model meu_modelo.joblib --output ./meu_pacote
+python exoplanet_predictor.py input.csv output.csv --bundle ./meu_pacote
 
 # 5. Relatório customizado
 python exoplanet_predictor.py input.csv output.csv --report --report-file relatorio.txt
+
+# 6. Catálogos enormes: processar em blocos com memória constante (CSV ou Parquet)
+python exoplanet_predictor.py catalogo.csv resultados.parquet --stream --chunk-size 100000
+
+# 7. Usar vários núcleos (um processo por núcleo)
+python exoplanet_predictor.py catalogo.csv resultados.csv --workers 32
+
+# 8. Triagem rápida: só a classificação, sem SHAP
+python exoplanet_predictor.py catalogo.csv resultados.csv --explanation none
+
+# 9. Reaproveitar predições entre execuções (planilhas com linhas repetidas)
+python exoplanet_predictor.py input.csv output.csv --cache-path predicoes_cache.sqlite3
+
+# 10. Entre serviços: Parquet ou Arrow IPC/Feather (sem parsing de texto; Arrow é lido com memory-map)
+python exoplanet_predictor.py catalogo.arrow resultados.arrow --stream
+
+# 11. Planilhas grandes: .xlsx lido linha a linha, só com as colunas do modelo
+python exoplanet_predictor.py catalogo.xlsx resultados.csv --stream --features-only
+
+# 12. Probabilidades pelo avaliador NumPy (sem o runtime do XGBoost; compare com benchmark_forest.py)
+python exoplanet_predictor.py input.csv output.csv --explanation none --inference numpy
 """
 
 # ============================================================================
@@ -132,7 +235,7 @@ python exoplanet_predictor.py input.csv output.csv --report --report-file relato
 # ============================================================================
 
 """
-O arquivo CSV ou Excel deve ter colunas com os nomes das features:
+O arquivo (CSV, Excel, Parquet ou Arrow IPC) deve ter colunas com os nomes das features:
 
 Exemplo CSV (mínimo necessário):
 koi_period,koi_prad,koi_steff,koi_depth
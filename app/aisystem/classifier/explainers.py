@@ -0,0 +1,82 @@
+# explainers.py
+# Backends de explicação (contribuições TreeSHAP por feature) do preditor.
+# Todos devolvem um array (n_linhas x n_features x n_classes), ou
+# (n_linhas x n_features) para modelos binários/regressão.
+
+import numpy as np
+import pandas as pd
+
+
+class ShapExplainer:
+    """
+    Usa shap.TreeExplainer. O import do shap (numba, llvmlite) e a criação do
+    TreeExplainer só acontecem na primeira explicação pedida, então um
+    preditor usado só para probabilidades nunca paga esse custo.
+    """
+
+    name = 'shap'
+
+    def __init__(self, model):
+        self._model = model
+        self._explainer = None
+
+    def prepare(self):
+        """Importa o shap e cria o TreeExplainer, sem calcular nada."""
+        if self._explainer is None:
+            import shap
+            self._explainer = shap.TreeExplainer(self._model)
+
+    def contributions(self, X: pd.DataFrame) -> np.ndarray:
+        self.prepare()
+        shap_values = self._explainer.shap_values(X)
+
+        # Multi-classe (shap antigo): lista de arrays (n_linhas x n_features)
+        if isinstance(shap_values, list):
+            shap_values = np.stack(shap_values, axis=-1)
+        return np.asarray(shap_values)
+
+
+class XGBoostExplainer:
+    """
+    Contribuições TreeSHAP exatas calculadas pelo próprio booster do XGBoost
+    (pred_contribs, em C++ multithread), sem depender do shap.
+    """
+
+    name = 'xgboost'
+
+    def __init__(self, model):
+        self._booster = model.get_booster()
+
+    def prepare(self):
+        pass
+
+    def contributions(self, X: pd.DataFrame) -> np.ndarray:
+        import xgboost as xgb
+
+        # DMatrix a partir do array NumPy: bem mais barato que a partir do DataFrame
+        dmatrix = xgb.DMatrix(np.ascontiguousarray(X.to_numpy(dtype=np.float32)),
+                              feature_names=list(X.columns))
+        contribs = self._booster.predict(dmatrix, pred_contribs=True)
+
+        # A última coluna é o viés (valor esperado); descartá-la
+        if contribs.ndim == 3:
+            # Multi-classe: (n_linhas x n_classes x n_features+1)
+            return contribs[:, :, :-1].transpose(0, 2, 1)
+        return contribs[:, :-1]
+
+
+EXPLAINER_BACKENDS = {
+    ShapExplainer.name: ShapExplainer,
+    XGBoostExplainer.name: XGBoostExplainer,
+}
+
+
+def make_explainer(backend: str, model):
+    """
+    Cria o backend de explicação pelo nome ('shap' ou 'xgboost').
+    """
+    if backend not in EXPLAINER_BACKENDS:
+        raise ValueError(
+            f"Backend de explicação inválido: {backend} (use {', '.join(EXPLAINER_BACKENDS)})"
+        )
+    return EXPLAINER_BACKENDS[backend](model)
@@ -0,0 +1,163 @@
+# forest_evaluator.py
+# Avaliador da floresta em NumPy puro: as árvores do booster são achatadas em
+# tabelas contíguas de nós (feature, limiar, filhos, valor da folha, direção
+# dos faltantes) e todas as árvores são percorridas de uma vez, por camada,
+# para um bloco de linhas. Não chama o runtime do XGBoost na predição.
+
+import json
+import numpy as np
+import pandas as pd
+
+# Linhas avaliadas por vez: blocos pequenos mantêm a matriz (linhas x árvores)
+# de nós no cache da CPU
+BLOCK_ROWS = 512
+
+# Objetivos suportados e a transformação da margem em probabilidade
+SUPPORTED_OBJECTIVES = ('multi:softprob', 'multi:softmax', 'binary:logistic')
+
+
+class ArrayForest:
+    """
+    Floresta de árvores de decisão em arrays NumPy, construída a partir de um
+    booster do XGBoost (gbtree, splits numéricos). Reproduz predict_proba.
+    """
+
+    def __init__(self, booster):
+        """
+        Achata as árvores do booster.
+
+        Args:
+            booster: xgboost.Booster (ou XGBClassifier, via get_booster())
+        """
+        if hasattr(booster, 'get_booster'):
+            booster = booster.get_booster()
+
+        learner = json.loads(booster.save_raw('json'))['learner']
+        self.objective = learner['objective']['name']
+        if self.objective not in SUPPORTED_OBJECTIVES:
+            raise ValueError(f"Objetivo não suportado pelo avaliador NumPy: {self.objective}")
+        if learner['gradient_booster']['name'] != 'gbtree':
+            raise ValueError("O avaliador NumPy suporta apenas boosters gbtree")
+
+        model = learner['gradient_booster']['model']
+        params = learner['learner_model_param']
+        self.n_classes = max(1, int(params['num_class']))
+        self.n_features = int(params['num_feature'])
+        # Margem inicial; em multi:softprob o base_score entra sem transformação
+        self.base_margin = float(np.asarray(json.loads(params['base_score'].replace('E', 'e'))).ravel()[0])
+        if self.objective == 'binary:logistic':
+            self.base_margin = float(np.log(self.base_margin / (1 - self.base_margin)))
+
+        trees = model['trees']
+        tree_class = np.asarray(model['tree_info'], dtype=np.intp)
+        sizes = np.array([len(tree['left_children']) for tree in trees])
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+        def stacked(key, dtype):
+            return np.concatenate([np.asarray(tree[key], dtype=dtype) for tree in trees])
+
+        for tree in trees:
+            if any(tree['split_type']):
+                raise ValueError("O avaliador NumPy não suporta splits categóricos")
+
+        node_tree_offset = np.repeat(offsets, sizes)
+        left = stacked('left_children', np.int64)
+        right = stacked('right_children', np.int64)
+        is_leaf = left == -1
+        node_ids = np.arange(len(left))
+
+        # Tabelas de nós (índices globais, int32). Folhas apontam para si
+        # mesmas, então percorrer além da profundidade da árvore não muda nada
+        self.feature = np.where(is_leaf, 0, stacked('split_indices', np.int64)).astype(np.int32)
+        self.threshold = stacked('split_conditions', np.float32)
+        self.default_left = stacked('default_left', bool)
+        # Filhos intercalados: children[2 * nó] = direita, children[2 * nó + 1] = esquerda,
+        # então o próximo nó é children[2 * nó + (x < limiar)]
+        self.children = np.stack([
+            np.where(is_leaf, node_ids, right + node_tree_offset),
+            np.where(is_leaf, node_ids, left + node_tree_offset),
+        ], axis=1).astype(np.int32).ravel()
+        # Nas folhas, split_conditions guarda o valor da folha
+        self.leaf_value = np.where(is_leaf, self.threshold, 0).astype(np.float32)
+
+        self.roots = offsets.astype(np.int32)
+        self.depth = max(_tree_depth(tree) for tree in trees)
+        # Soma das folhas por classe: (árvores x classes)
+        self.class_matrix = np.zeros((len(trees), self.n_classes))
+        self.class_matrix[np.arange(len(trees)), tree_class] = 1
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def leaf_indices(self, X: np.ndarray) -> np.ndarray:
+        """
+        Nó folha alcançado em cada árvore (índices globais), para um bloco.
+
+        Args:
+            X: Matriz float32 contígua (n_linhas x n_features)
+
+        Returns:
+            Array (n_linhas x n_árvores)
+        """
+        flat = X.ravel()
+        row_offsets = (np.arange(len(X), dtype=np.int32) * X.shape[1])[:, None]
+        has_missing = np.isnan(flat).any()
+
+        # np.take é bem mais rápido que indexação avançada (arr[idx]) aqui
+        nodes = np.repeat(self.roots[None, :], len(X), axis=0)
+        for _ in range(self.depth):
+            values = np.take(flat, np.take(self.feature, nodes) + row_offsets)
+            thresholds = np.take(self.threshold, nodes)
+            if has_missing:
+                # Mesma regra do XGBoost: NaN segue a direção padrão do nó
+                go_left = np.where(np.take(self.default_left, nodes),
+                                   ~(values >= thresholds), values < thresholds)
+            else:
+                go_left = values < thresholds
+            nodes = np.take(self.children, 2 * nodes + go_left)
+        return nodes
+
+    def predict_margin(self, X) -> np.ndarray:
+        """Margem (soma das folhas por classe + base_score), (n_linhas x n_classes)."""
+        X = np.ascontiguousarray(X.to_numpy() if isinstance(X, pd.DataFrame) else X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Esperado uma matriz com {self.n_features} features, recebido {X.shape}")
+
+        margin = np.empty((len(X), self.n_classes))
+        for start in range(0, len(X), BLOCK_ROWS):
+            block = X[start:start + BLOCK_ROWS]
+            leaves = np.take(self.leaf_value, self.leaf_indices(block))
+            margin[start:start + BLOCK_ROWS] = leaves @ self.class_matrix
+        return margin + self.base_margin
+
+    def predict_proba(self, X) -> np.ndarray:
+        """
+        Probabilidades por classe, equivalentes a XGBClassifier.predict_proba.
+
+        Args:
+            X: DataFrame ou matriz (n_linhas x n_features), já imputada
+
+        Returns:
+            Array (n_linhas x n_classes)
+        """
+        margin = self.predict_margin(X)
+        if self.objective == 'binary:logistic':
+            positive = 1 / (1 + np.exp(-margin[:, 0]))
+            return np.column_stack([1 - positive, positive])
+
+        # Softmax estável
+        exp = np.exp(margin - margin.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _tree_depth(tree: dict) -> int:
+    """Profundidade máxima (em splits) de uma árvore do JSON do XGBoost."""
+    left, right = tree['left_children'], tree['right_children']
+    depth = 0
+    frontier = [0]
+    while True:
+        frontier = [child for node in frontier if left[node] != -1 for child in (left[node], right[node])]
+        if not frontier:
+            return depth
+        depth += 1
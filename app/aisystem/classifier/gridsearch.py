@@ -1,9 +1,13 @@
 # gridsearch_decision_tree.py
-import os, json, joblib
+import os, sys, json, joblib, argparse, hashlib
 import pandas as pd, numpy as np
-from sklearn.model_selection import StratifiedKFold, GridSearchCV, cross_val_predict
+from sklearn.model_selection import StratifiedKFold, GridSearchCV, ParameterGrid, cross_val_predict
 from sklearn.tree import DecisionTreeClassifier
-from sklearn.metrics import classification_report, confusion_matrix
+from sklearn.metrics import classification_report, confusion_matrix, f1_score
+from joblib import Parallel, delayed
+from trial_store import TrialStore
+from thread_budget import available_cpus, plan_threads, thread_layout, log_plan
+from tree_search import split_grid, evaluate_group, rank_candidates
 
 # Ajuste este caminho para o CSV padronizado gerado antes
 csv_path = "./datasets/selected_features_exoplanets.csv"
@@ -17,10 +21,33 @@ param_grid = {
     "class_weight": [None, "balanced"]
 }
 
+# --search grid (padrão) usa o GridSearchCV, com um treino por combinação e
+# fold. --search prune treina uma árvore por (criterion, class_weight,
+# min_samples_leaf, fold) e avalia max_depth e min_samples_split podando essa
+# árvore (ver tree_search.py); as notas da poda só ordenam a grade, e as
+# --rescore-top melhores combinações são retreinadas em todos os folds para
+# escolher o modelo final.
+# Com --store, as notas de cada (configuração, fold) ficam num arquivo SQLite:
+# rodar de novo retoma a busca, e vários processos/máquinas com o mesmo
+# arquivo e o mesmo --study dividem o trabalho (ver trial_store.py)
+parser = argparse.ArgumentParser(description='GridSearch da árvore de decisão')
+parser.add_argument('--search', choices=['grid', 'prune'], default='grid',
+                    help='grid: GridSearchCV (um treino por combinação); prune: poda de uma árvore por fold')
+parser.add_argument('--rescore-top', type=int, default=10,
+                    help='Com --search prune: combinações retreinadas para escolher o melhor modelo')
+parser.add_argument('--store', help='Arquivo SQLite do armazém de tentativas (busca retomável/distribuída)')
+parser.add_argument('--study', help='Nome do estudo no armazém (padrão: decision-tree-<search>)')
+parser.add_argument('--lease', type=float, default=1800,
+                    help='Segundos até uma tarefa de um processo que morreu voltar para a fila')
+parser.add_argument('--search-only', action='store_true',
+                    help='Só ajuda na busca (processos auxiliares): não treina o modelo final')
+parser.add_argument('--cpus', type=int, default=available_cpus(), help='Núcleos usados pelos processos do GridSearch')
+args = parser.parse_args()
+
 # Config
 k = 5
 random_state = 0
-n_jobs = -1  # use all CPUs; ajuste se necessário
+cpus = args.cpus  # núcleos para a busca; ajuste com --cpus
 
 # 1) carregar
 df = pd.read_csv(csv_path)
@@ -32,19 +59,97 @@ skf = StratifiedKFold(n_splits=k, shuffle=True, random_state=random_state)
 clf = DecisionTreeClassifier(random_state=random_state)
 
 # 3) GridSearch
-grid = GridSearchCV(clf, param_grid=param_grid, scoring="f1_weighted", cv=skf, n_jobs=n_jobs, verbose=2, refit=True)
-grid.fit(X, y)  # ATENÇÃO: pode demorar muito se grade for grande
+folds = list(skf.split(X, y))
+
+
+def refit_task(task):
+    # Uma configuração em um fold: [(parâmetros, f1_weighted)]
+    train_idx, valid_idx = folds[task["fold"]]
+    model = DecisionTreeClassifier(random_state=random_state, **task["params"])
+    model.fit(X.iloc[train_idx], y[train_idx])
+    return [(task["params"], f1_score(y[valid_idx], model.predict(X.iloc[valid_idx]), average="weighted"))]
+
+
+def run_local(tasks, evaluate, label):
+    # A árvore usa uma thread só: todos os núcleos viram processos
+    plan = plan_threads(len(tasks), cpus, inner_parallel=False)
+    log_plan(plan, label)
+    with thread_layout(plan):
+        return Parallel(n_jobs=plan.outer)(delayed(evaluate)(task) for task in tasks)
+
+
+if args.search == "prune":
+    growth_grid, prune_variants = split_grid(param_grid)
+
+    def evaluate_task(task):
+        # Uma árvore em um fold: [(parâmetros, f1_weighted)] de todas as variantes de poda
+        train_idx, valid_idx = folds[task["fold"]]
+        return evaluate_group(X, y, train_idx, valid_idx, task["params"], prune_variants, random_state)
+
+    tasks = [{"params": params, "fold": fold} for params in growth_grid for fold in range(k)]
+else:
+    evaluate_task = refit_task
+    tasks = [{"params": params, "fold": fold} for params in ParameterGrid(param_grid) for fold in range(k)]
+
+if args.store or args.search == "prune":
+    if args.store:
+        config = {
+            "model": "DecisionTree",
+            "param_grid": param_grid,
+            "cv_folds": k,
+            "random_state": random_state,
+            "data_sha1": hashlib.sha1(pd.util.hash_pandas_object(df).values.tobytes()).hexdigest(),
+        }
+        if args.search == "prune":
+            config["search"] = "prune"
+        store = TrialStore(args.store, args.study or f"decision-tree-{args.search}", config=config,
+                           lease_seconds=args.lease)
+        print(f"Armazém de tentativas: {args.store} (estudo {store.study}, processo {store.worker})")
+        results = store.run(tasks, evaluate_task)
+        print(f"{len(tasks)} tarefas, {store.completed} executadas por este processo")
+    else:
+        print(f"{len(tasks)} árvores ({len(growth_grid)} configurações × {k} folds) para "
+              f"{len(ParameterGrid(param_grid))} combinações da grade")
+        results = run_local(tasks, evaluate_task, "poda")
 
+    candidates = list(ParameterGrid(param_grid))
+    ranking = rank_candidates(candidates, results)
+    if args.search_only:
+        print("Busca concluída; melhor f1_weighted:", ranking[0][1])
+        sys.exit(0)
+    if args.search == "prune":
+        # Notas da poda só ordenam: as melhores são retreinadas em todos os folds
+        # (na ordem da grade, para empates ficarem como no GridSearchCV)
+        top = [params for params, _ in ranking[:max(1, args.rescore_top)]]
+        candidates = [params for params in candidates if params in top]
+        print(f"Retreinando as {len(candidates)} melhores combinações da poda")
+        rescored = run_local([{"params": params, "fold": fold} for params in candidates for fold in range(k)],
+                             refit_task, "retreino")
+        ranking = rank_candidates(candidates, rescored)
+    best_params, best_score = ranking[0]
+    best_model = DecisionTreeClassifier(random_state=random_state, **best_params).fit(X, y)
+else:
+    # A árvore usa uma thread só: todos os núcleos viram processos do GridSearch,
+    # com OpenMP/BLAS limitados a 1 thread em cada
+    plan = plan_threads(len(tasks), cpus, inner_parallel=False)
+    log_plan(plan, "GridSearch")
+    grid = GridSearchCV(clf, param_grid=param_grid, scoring="f1_weighted", cv=skf, n_jobs=plan.outer, verbose=2, refit=True)
+    with thread_layout(plan):
+        grid.fit(X, y)  # ATENÇÃO: pode demorar muito se grade for grande
+    best_model = grid.best_estimator_
+    best_params = grid.best_params_
+    best_score = grid.best_score_
 
-joblib.dump(grid.best_estimator_, "decision_tree_grid_best_model.joblib")
+joblib.dump(best_model, "decision_tree_grid_best_model.joblib")
 # 5) avaliação agregada (cross-val predictions com melhor config encontrada)
-best_params = grid.best_params_
-best_score = grid.best_score_
 print("Best params:", best_params)
 print("Best CV f1_weighted:", best_score)
 
 best_clf = DecisionTreeClassifier(random_state=random_state, **best_params)
-y_pred = cross_val_predict(best_clf, X, y, cv=skf, n_jobs=n_jobs)
+plan = plan_threads(k, cpus, inner_parallel=False)
+log_plan(plan, "cross_val_predict")
+with thread_layout(plan):
+    y_pred = cross_val_predict(best_clf, X, y, cv=skf, n_jobs=plan.outer)
 
 print(classification_report(y, y_pred, target_names=["FALSE POS (0)","CANDIDATE (1)","CONFIRMED (2)"]))
 cm = confusion_matrix(y, y_pred, labels=[0,1,2])
@@ -1,8 +1,11 @@
-import os, json, joblib
+import os, sys, json, joblib, argparse, hashlib
 import pandas as pd, numpy as np
-from sklearn.model_selection import StratifiedKFold, GridSearchCV, cross_val_predict
+from sklearn.model_selection import StratifiedKFold
 from sklearn.metrics import classification_report, confusion_matrix
 import xgboost as xgb
+from xgb_search import FoldEvaluator, run_grid_search, run_successive_halving, run_hyperband, RESOURCES
+from trial_store import TrialStore
+from thread_budget import available_cpus, plan_threads, log_plan
 
 # Ajuste este caminho para o CSV padronizado gerado antes
 csv_path = "./datasets/selected_features_exoplanets.csv"
@@ -31,13 +34,46 @@ param_grid_full = {
     "reg_lambda": [1, 1.5, 2]      # regularização L2
 }
 
+# Modo de busca e grade pela linha de comando (padrão: grid + fast, como antes).
+# grid avalia a grade inteira (f1_weighted nos mesmos folds do GridSearchCV).
+# halving/hyperband usam successive halving (xgb_search.py): os candidatos
+# começam com poucas árvores e/ou uma fração dos dados e só o melhor 1/eta
+# recebe mais orçamento, o que torna a grade COMPLETA viável.
+# Com --store, as notas de cada (configuração, fold) ficam num arquivo SQLite:
+# rodar de novo retoma a busca, e vários processos/máquinas com o mesmo
+# arquivo (ex.: num diretório compartilhado) e o mesmo --study dividem o
+# trabalho. Leaderboard: python trial_store.py report <arquivo>
+parser = argparse.ArgumentParser(description='Busca de hiperparâmetros do XGBoost')
+parser.add_argument('--search', choices=['grid', 'halving', 'hyperband'], default='grid',
+                    help='grid = busca exaustiva; halving/hyperband = busca adaptativa')
+parser.add_argument('--grid', choices=['fast', 'full'], default='fast', help='Grade de parâmetros')
+parser.add_argument('--eta', type=int, default=3, help='Fator de redução da busca adaptativa')
+parser.add_argument('--min-rounds', type=int, default=20, help='Árvores na primeira rodada')
+parser.add_argument('--resource', choices=RESOURCES, default='both',
+                    help='Orçamento reduzido nas primeiras rodadas: árvores, dados ou ambos')
+parser.add_argument('--min-data-fraction', type=float, default=0.1, help='Menor fração dos dados de treino')
+parser.add_argument('--n-candidates', type=int,
+                    help='halving: candidatos sorteados da grade (padrão: a grade inteira)')
+parser.add_argument('--early-stopping-rounds', type=int,
+                    help='Para o treino de cada fold quando o mlogloss da validação não melhora '
+                         'por N árvores (padrão: desligado)')
+parser.add_argument('--store', help='Arquivo SQLite do armazém de tentativas (busca retomável/distribuída)')
+parser.add_argument('--study', help='Nome do estudo no armazém (padrão: xgboost-<search>-<grid>)')
+parser.add_argument('--lease', type=float, default=1800,
+                    help='Segundos até uma tarefa de um processo que morreu voltar para a fila')
+parser.add_argument('--cpus', type=int, default=available_cpus(),
+                    help='Núcleos usados (divididos entre folds simultâneos e threads do XGBoost)')
+parser.add_argument('--search-only', action='store_true',
+                    help='Só ajuda na busca (processos auxiliares): não treina o modelo final nem grava resultados')
+args = parser.parse_args()
+
 # Escolha qual grade usar (comece com fast!)
-param_grid = param_grid_fast
+param_grid = param_grid_full if args.grid == 'full' else param_grid_fast
 
 # Config
 k = 5
 random_state = 0
-n_jobs = -1  # use all CPUs; ajuste se necessário
+cpus = args.cpus  # núcleos para a busca; ajuste com --cpus
 
 # 1) carregar
 df = pd.read_csv(csv_path)
@@ -55,30 +91,80 @@ clf = xgb.XGBClassifier(
     tree_method='hist'  # mais rápido
 )
 
-# 4) GridSearch
-print("Iniciando GridSearch com XGBoost...")
+# 4) Busca de hiperparâmetros
+# n_estimators não é treinado eixo a eixo: cada configuração é treinada uma
+# vez por fold com o maior valor e os menores são avaliados nos prefixos
+print(f"Iniciando busca ({args.search}) com XGBoost...")
 print(f"Total de combinações: {np.prod([len(v) for v in param_grid.values()])}")
 
-grid = GridSearchCV(
-    clf, 
-    param_grid=param_grid, 
-    scoring="f1_weighted", 
-    cv=skf, 
-    n_jobs=n_jobs, 
-    verbose=2, 
-    refit=True
-)
-
-grid.fit(X, y)
+options = dict(eta=args.eta, min_rounds=args.min_rounds, resource=args.resource,
+               min_data_fraction=args.min_data_fraction, random_state=random_state)
+
+store = None
+if args.store:
+    # Processos do mesmo estudo precisam da mesma busca sobre os mesmos dados
+    study_config = {
+        "model": "XGBoost",
+        "search": args.search,
+        "param_grid": param_grid,
+        "cv_folds": k,
+        "random_state": random_state,
+        "early_stopping_rounds": args.early_stopping_rounds,
+        "data_sha1": hashlib.sha1(pd.util.hash_pandas_object(df).values.tobytes()).hexdigest(),
+    }
+    if args.search != 'grid':
+        study_config.update(options, n_candidates=args.n_candidates)
+    store = TrialStore(args.store, args.study or f"xgboost-{args.search}-{args.grid}",
+                       config=study_config, lease_seconds=args.lease)
+    print(f"Armazém de tentativas: {args.store} (estudo {store.study}, processo {store.worker})")
+
+# Folds e candidatos simultâneos × threads do XGBoost, sem ultrapassar `cpus`;
+# o layout de cada rodada (impresso por rodada) depende de quantas tarefas ela tem
+if store:
+    log_plan(plan_threads(1, cpus), "busca com armazém, uma tarefa por vez neste processo")
+else:
+    print(f"Orçamento de CPU: {cpus} núcleos")
+
+evaluator = FoldEvaluator(X, y, skf.split(X, y), clf.get_params(), seed=random_state,
+                          early_stopping_rounds=args.early_stopping_rounds, store=store, cpus=cpus)
+if args.search == 'grid':
+    search = run_grid_search(param_grid, evaluator.evaluate_many)
+elif args.search == 'halving':
+    search = run_successive_halving(param_grid, evaluator.evaluate_many, n_candidates=args.n_candidates, **options)
+else:
+    search = run_hyperband(param_grid, evaluator.evaluate_many, **options)
+print(f"{search.n_candidates} candidatos, {len(search.trials)} avaliações, "
+      f"{evaluator.fits} treinos em {search.seconds:.1f}s")
+
+if args.search_only:
+    print(f"\nBusca concluída; melhor f1_weighted: {search.best_score:.4f}")
+    sys.exit(0)
+
+# Refit do melhor candidato com todos os dados (como o refit do GridSearchCV)
+best_params = search.best_params
+best_score = search.best_score
+best_model = xgb.XGBClassifier(**{**clf.get_params(), **best_params, "n_jobs": cpus}).fit(X, y)
+# O modelo salvo não fixa o número de threads (quem o carrega decide)
+best_model.set_params(n_jobs=None)
+search_info = {
+    "mode": args.search,
+    "early_stopping_rounds": args.early_stopping_rounds,
+    "candidates": search.n_candidates,
+    "evaluations": len(search.trials),
+    "fits": evaluator.fits,
+    "seconds": round(search.seconds, 2),
+}
+if store:
+    search_info.update(store=args.store, study=store.study)
+if args.search != 'grid':
+    search_info.update(eta=args.eta, min_rounds=args.min_rounds, resource=args.resource,
+                       min_data_fraction=args.min_data_fraction)
 
 # Salvar melhor modelo
-joblib.dump(grid.best_estimator_, "xgboost_grid_best_model.joblib")
+joblib.dump(best_model, "xgboost_grid_best_model.joblib")
 print("\nModelo salvo em: xgboost_grid_best_model.joblib")
 
 # 5) Resultados do melhor modelo
-best_params = grid.best_params_
-best_score = grid.best_score_
-
 print("\n" + "="*60)
 print("RESULTADOS DO GRID SEARCH")
 print("="*60)
@@ -90,15 +176,8 @@ print("\n" + "="*60)
 print("AVALIAÇÃO COM CROSS-VALIDATION")
 print("="*60)
 
-best_clf = xgb.XGBClassifier(
-    random_state=random_state,
-    eval_metric='mlogloss',
-    use_label_encoder=False,
-    tree_method='hist',
-    **best_params
-)
-
-y_pred = cross_val_predict(best_clf, X, y, cv=skf, n_jobs=n_jobs)
+# Mesmos folds e matrizes quantizadas da busca (sem refazer a quantização)
+y_pred = evaluator.cross_val_predict(best_params)
 
 print("\nClassification Report:")
 print(classification_report(
@@ -115,10 +194,10 @@ print("\n" + "="*60)
 print("TOP 15 FEATURES MAIS IMPORTANTES")
 print("="*60)
 
-best_clf.fit(X, y)
+# O modelo salvo já foi treinado com todos os dados e a melhor configuração
 feature_importance = pd.DataFrame({
     'feature': X.columns,
-    'importance': best_clf.feature_importances_
+    'importance': best_model.feature_importances_
 }).sort_values('importance', ascending=False)
 
 print(feature_importance.head(15).to_string(index=False))
@@ -130,7 +209,8 @@ results = {
     "best_cv_f1_weighted": float(best_score),
     "cv_folds": k,
     "random_state": random_state,
-    "top_features": feature_importance.head(15).to_dict('records')
+    "top_features": feature_importance.head(15).to_dict('records'),
+    "search": search_info,
 }
 
 with open("xgboost_results.json", "w") as f:
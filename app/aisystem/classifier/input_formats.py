@@ -0,0 +1,252 @@
+# input_formats.py
+# Leitura das entradas do modo em lote. O formato é detectado pelo conteúdo
+# (assinatura dos primeiros bytes), não pelo nome do arquivo, e a entrada pode
+# ser um caminho, bytes ou um objeto tipo arquivo (ex.: upload do Django), que
+# é lido no lugar, sem cópia para um arquivo temporário.
+# Parquet e Arrow IPC (Feather v2) lidos de um caminho usam memory-map, e
+# planilhas .xlsx são lidas linha a linha (openpyxl em modo somente leitura).
+
+import io
+import os
+import numpy as np
+import pandas as pd
+from collections import Counter
+from typing import Collection, Iterator, Optional, Union
+
+InputSource = Union[str, os.PathLike, bytes, bytearray, memoryview, io.IOBase]
+
+# Assinaturas (magic bytes) dos formatos binários aceitos
+_SIGNATURES = (
+    (b'PK\x03\x04', 'xlsx'),                          # zip (Office Open XML)
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'xls'),     # OLE2 (Excel 97-2003)
+    (b'PAR1', 'parquet'),
+    (b'ARROW1', 'arrow'),                             # Arrow IPC, formato de arquivo (Feather v2)
+    (b'\xff\xff\xff\xff', 'arrow_stream'),            # Arrow IPC, formato de stream
+)
+
+# Formatos lidos pelo pyarrow
+ARROW_FORMATS = ('parquet', 'arrow', 'arrow_stream')
+
+# Bytes lidos para detectar o formato
+_SNIFF_BYTES = 512
+
+
+def open_input(source: InputSource):
+    """
+    Normaliza a entrada: bytes viram um buffer em memória; caminhos e
+    objetos tipo arquivo são devolvidos como estão.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    return source
+
+
+def _read_head(source) -> bytes:
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return f.read(_SNIFF_BYTES)
+
+    position = source.tell()
+    head = source.read(_SNIFF_BYTES)
+    source.seek(position)
+    return head.encode() if isinstance(head, str) else bytes(head)
+
+
+def detect_input_format(source: InputSource) -> str:
+    """
+    Detecta o formato da entrada pelo conteúdo.
+
+    Args:
+        source: Caminho, bytes ou objeto tipo arquivo (posicionável)
+
+    Returns:
+        'csv', 'xlsx', 'xls', 'parquet', 'arrow' ou 'arrow_stream'
+
+    Raises:
+        ValueError: conteúdo binário de formato desconhecido
+    """
+    head = _read_head(open_input(source))
+    for signature, input_format in _SIGNATURES:
+        if head.startswith(signature):
+            return input_format
+
+    # Texto delimitado: qualquer outro binário é rejeitado
+    if b'\x00' in head:
+        raise ValueError("Formato de arquivo não reconhecido (use CSV, Excel, Parquet ou Arrow IPC)")
+    return 'csv'
+
+
+def _is_path(source) -> bool:
+    return isinstance(source, (str, os.PathLike))
+
+
+def _read_arrow_table(source, input_format: str):
+    """
+    Tabela Arrow de uma entrada Parquet/Arrow IPC. Caminhos são mapeados em
+    memória, então o arquivo não é copiado para a memória do processo.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if input_format == 'parquet':
+        return pq.read_table(source, memory_map=_is_path(source))
+
+    if _is_path(source):
+        source = pa.memory_map(os.fspath(source), 'r')
+    if input_format == 'arrow':
+        return pa.ipc.open_file(source).read_all()
+    return pa.ipc.open_stream(source).read_all()
+
+
+def _read_xlsx_chunks(source, chunksize: int, columns: Optional[Collection[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Lê a primeira planilha de um .xlsx em blocos, linha a linha, sem montar a
+    planilha inteira na memória. Só as colunas em `columns` (se informado)
+    são extraídas; linhas totalmente vazias são ignoradas.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.active
+        # As dimensões gravadas no arquivo podem estar erradas: ler até o fim
+        worksheet.reset_dimensions()
+        rows = worksheet.iter_rows(values_only=True)
+
+        header = next(rows, None)
+        if header is None:
+            yield pd.DataFrame()
+            return
+
+        # Mesmos nomes que pd.read_excel: sem título -> "Unnamed: i", repetidos -> "nome.1"
+        names = []
+        seen = Counter()
+        for i, name in enumerate(header):
+            name = f"Unnamed: {i}" if name is None else name
+            names.append(f"{name}.{seen[name]}" if seen[name] else name)
+            seen[name] += 1
+
+        keep = [i for i, name in enumerate(names) if columns is None or name in columns]
+        names = [names[i] for i in keep]
+
+        def make_chunk(block, start):
+            # Inteiros e floats misturados na mesma coluna: float, como no pandas
+            frame = pd.DataFrame(block, columns=names, index=pd.RangeIndex(start, start + len(block)))
+            return frame.infer_objects()
+
+        start = 0
+        block = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            # Células vazias viram NaN (como no pd.read_excel), para que colunas
+            # numéricas sejam float e não object
+            block.append([np.nan if i >= len(row) or row[i] is None else row[i] for i in keep])
+            if len(block) == chunksize:
+                yield make_chunk(block, start)
+                start += len(block)
+                block = []
+        if block or start == 0:
+            yield make_chunk(block, start)
+    finally:
+        workbook.close()
+
+
+def read_input(source: InputSource) -> pd.DataFrame:
+    """Lê a entrada inteira em um DataFrame."""
+    source = open_input(source)
+    input_format = detect_input_format(source)
+    if input_format == 'csv':
+        return pd.read_csv(source)
+    if input_format in ARROW_FORMATS:
+        return _read_arrow_table(source, input_format).to_pandas()
+    if input_format == 'xlsx':
+        return pd.concat(_read_xlsx_chunks(source, chunksize=50_000))
+    return pd.read_excel(source)
+
+
+def read_input_chunks(source: InputSource, chunksize: int,
+                      columns: Optional[Collection[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Lê a entrada em blocos de até `chunksize` linhas. O índice de cada bloco
+    continua a numeração do bloco anterior.
+
+    Args:
+        source: Caminho, bytes ou objeto tipo arquivo
+        chunksize: Número de linhas por bloco
+        columns: Se informado, lê apenas estas colunas (as ausentes são ignoradas)
+    """
+    source = open_input(source)
+    input_format = detect_input_format(source)
+    if columns is not None:
+        columns = set(columns)
+
+    if input_format == 'csv':
+        usecols = (lambda name: name in columns) if columns is not None else None
+        yield from pd.read_csv(source, chunksize=chunksize, usecols=usecols)
+    elif input_format == 'xlsx':
+        yield from _read_xlsx_chunks(source, chunksize, columns)
+    elif input_format == 'parquet':
+        import pyarrow.parquet as pq
+
+        # Um bloco por vez, sem carregar o arquivo inteiro
+        start = 0
+        parquet_file = pq.ParquetFile(source, memory_map=_is_path(source))
+        selected = None
+        if columns is not None:
+            selected = [name for name in parquet_file.schema_arrow.names if name in columns]
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=selected):
+            chunk = batch.to_pandas()
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            start += len(chunk)
+            yield chunk
+    elif input_format in ARROW_FORMATS:
+        # Com memory-map, fatiar a tabela não copia os dados
+        table = _read_arrow_table(source, input_format)
+        if columns is not None:
+            table = table.select([name for name in table.column_names if name in columns])
+        for start in range(0, table.num_rows, chunksize):
+            chunk = table.slice(start, chunksize).to_pandas()
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            yield chunk
+    else:
+        # .xls (formato antigo) não lê em blocos: fatiar a planilha carregada
+        usecols = (lambda name: name in columns) if columns is not None else None
+        df = pd.read_excel(source, usecols=usecols)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+
+
+def count_input_rows(source: InputSource) -> Optional[int]:
+    """
+    Estima o número de linhas de dados sem carregar a entrada (usado para
+    reportar progresso). Retorna None se não for possível.
+    """
+    if not _is_path(source):
+        return None
+    input_format = detect_input_format(source)
+
+    if input_format == 'csv':
+        lines = 0
+        last = b'\n'
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                lines += block.count(b'\n')
+                last = block[-1:]
+        if last != b'\n':
+            lines += 1
+        # Descontar o cabeçalho
+        return max(lines - 1, 0)
+    if input_format == 'xlsx':
+        from openpyxl import load_workbook
+        workbook = load_workbook(source, read_only=True)
+        try:
+            return max((workbook.active.max_row or 1) - 1, 0)
+        finally:
+            workbook.close()
+    if input_format == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(source).metadata.num_rows
+    if input_format == 'arrow':
+        return _read_arrow_table(source, input_format).num_rows
+    return None
@@ -0,0 +1,141 @@
+# instrumentation.py
+# Cronômetros por etapa do preditor (leitura, conversão numérica, imputação,
+# predict_proba, SHAP, ...) e contadores de linhas. Desligados por padrão:
+# stage() devolve um objeto nulo compartilhado e o custo é uma checagem de
+# flag por chamada (nunca por linha). Ligados, cada etapa é somada ao coletor
+# do contexto atual (uma requisição, ver collect()) e repassada ao observador
+# global (ex.: os histogramas do endpoint /metrics).
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+# Observador global: observer(etapa, segundos, linhas)
+StageObserver = Callable[[str, float, int], None]
+
+_enabled = False
+_observer: Optional[StageObserver] = None
+_current: ContextVar[Optional['StageTimings']] = ContextVar('stage_timings', default=None)
+
+
+def configure(enabled: bool, observer: Optional[StageObserver] = None):
+    """
+    Liga ou desliga os cronômetros do processo.
+
+    Args:
+        enabled: Se False, stage() e timed_iter() não medem nada
+        observer: Função chamada ao fim de cada etapa (opcional)
+    """
+    global _enabled, _observer
+    _enabled = enabled
+    _observer = observer
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+class StageTimings:
+    """Tempo (s) e linhas acumulados por etapa, na ordem em que apareceram."""
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {}
+
+    def add(self, name: str, seconds: float, rows: int = 0):
+        entry = self.stages.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += rows
+
+
+class _Stage:
+    __slots__ = ('name', 'rows', '_start')
+
+    def __init__(self, name: str, rows: int):
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.name, time.perf_counter() - self._start, self.rows)
+        return False
+
+
+class _NullStage:
+    """Etapa que não mede nada (instrumentação desligada); `rows` é ignorado."""
+
+    rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def _record(name: str, seconds: float, rows: int):
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds, rows)
+    if _observer is not None:
+        _observer(name, seconds, rows)
+
+
+def stage(name: str, rows: int = 0):
+    """
+    Cronômetro de uma etapa, para usar com `with`. As linhas podem ser
+    informadas na criação ou depois, em `.rows`, quando só são conhecidas
+    ao fim da etapa.
+
+    Args:
+        name: Nome da etapa
+        rows: Linhas processadas na etapa
+    """
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(name, rows)
+
+
+def timed_iter(name: str, iterable: Iterable) -> Iterable:
+    """
+    Mede o tempo gasto produzindo cada item de um iterador (ex.: leitura de
+    blocos), contando len(item) como linhas.
+    """
+    if not _enabled:
+        return iterable
+    return _timed_iter(name, iter(iterable))
+
+
+def _timed_iter(name: str, iterator: Iterator) -> Iterator:
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        _record(name, time.perf_counter() - start, len(item))
+        yield item
+
+
+@contextmanager
+def collect() -> Iterator[Optional[StageTimings]]:
+    """
+    Coleta as etapas executadas no contexto atual (ex.: uma requisição).
+    Devolve None se a instrumentação estiver desligada.
+    """
+    if not _enabled:
+        yield None
+        return
+
+    timings = StageTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
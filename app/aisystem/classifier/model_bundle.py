@@ -0,0 +1,145 @@
+# model_bundle.py
+# Pacote autocontido do modelo: booster no formato nativo do XGBoost + schema
+# pré-calculado (ordem das features, dtypes, medianas e labels das classes).
+# O preditor carrega apenas este pacote, sem precisar do CSV de treino.
+
+import os
+import json
+import hashlib
+import argparse
+import pandas as pd
+import xgboost as xgb
+from typing import Dict
+
+# Versão do formato do pacote (incrementar se o schema mudar)
+BUNDLE_FORMAT_VERSION = 1
+
+MODEL_FILENAME = "model.ubj"
+SCHEMA_FILENAME = "schema.json"
+
+TARGET_COLUMN = "koi_disposition_num"
+
+DEFAULT_CLASS_LABELS = {
+    0: "FALSE POSITIVE",
+    1: "CANDIDATE",
+    2: "CONFIRMED"
+}
+
+
+def _file_digest(path: str) -> str:
+    """Hash curto do arquivo do modelo, usado como versão do modelo."""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()[:12]
+
+
+def build_bundle(model_path: str, training_data_path: str, bundle_dir: str,
+                 class_labels: Dict[int, str] = None) -> Dict:
+    """
+    Gera o pacote do modelo a partir do .joblib treinado e do CSV de treino.
+
+    Args:
+        model_path: Caminho para o modelo treinado (.joblib)
+        training_data_path: CSV usado no treino (para ordem das features e medianas)
+        bundle_dir: Diretório de saída do pacote
+        class_labels: Labels das classes (padrão: FALSE POSITIVE/CANDIDATE/CONFIRMED)
+
+    Returns:
+        Dicionário com o schema gravado
+    """
+    import joblib
+
+    model = joblib.load(model_path)
+
+    df_train = pd.read_csv(training_data_path)
+    X_train = df_train.drop(columns=[TARGET_COLUMN])
+
+    os.makedirs(bundle_dir, exist_ok=True)
+    model_file = os.path.join(bundle_dir, MODEL_FILENAME)
+    model.save_model(model_file)
+
+    class_labels = class_labels or DEFAULT_CLASS_LABELS
+    medians = X_train.median()
+
+    schema = {
+        "bundle_version": BUNDLE_FORMAT_VERSION,
+        "model_version": _file_digest(model_file),
+        "model_file": MODEL_FILENAME,
+        "feature_names": X_train.columns.tolist(),
+        "feature_dtypes": {col: str(dtype) for col, dtype in X_train.dtypes.items()},
+        "feature_medians": {col: float(medians[col]) for col in X_train.columns},
+        "class_labels": {str(k): v for k, v in class_labels.items()},
+    }
+
+    with open(os.path.join(bundle_dir, SCHEMA_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(schema, f, indent=2)
+
+    return schema
+
+
+def load_bundle(bundle_dir: str):
+    """
+    Carrega o pacote do modelo.
+
+    Args:
+        bundle_dir: Diretório gerado por build_bundle
+
+    Returns:
+        Tupla (modelo XGBClassifier, schema)
+    """
+    with open(os.path.join(bundle_dir, SCHEMA_FILENAME), encoding='utf-8') as f:
+        schema = json.load(f)
+
+    if schema.get("bundle_version") != BUNDLE_FORMAT_VERSION:
+        raise ValueError(
+            f"Versão de pacote não suportada: {schema.get('bundle_version')} "
+            f"(esperado {BUNDLE_FORMAT_VERSION})"
+        )
+
+    model = xgb.XGBClassifier()
+    model.load_model(os.path.join(bundle_dir, schema["model_file"]))
+
+    schema["class_labels"] = {int(k): v for k, v in schema["class_labels"].items()}
+
+    return model, schema
+
+
+def main():
+    """
+    Gera o pacote do modelo para o servidor.
+
+    Uso:
+        python model_bundle.py
+        python model_bundle.py --model meu_modelo.joblib --output ./model_bundle
+    """
+    parser = argparse.ArgumentParser(
+        description='Gera o pacote autocontido do modelo (booster nativo + schema)'
+    )
+    parser.add_argument(
+        '--model',
+        default='xgboost_grid_best_model1.joblib',
+        help='Caminho para o modelo treinado'
+    )
+    parser.add_argument(
+        '--training-data',
+        default='./datasets/selected_features_exoplanets.csv',
+        help='Caminho para dados de treinamento'
+    )
+    parser.add_argument(
+        '--output',
+        default='./model_bundle',
+        help='Diretório de saída do pacote'
+    )
+
+    args = parser.parse_args()
+
+    schema = build_bundle(args.model, args.training_data, args.output)
+    print(f"Pacote salvo em: {args.output}")
+    print(f" Versão do modelo: {schema['model_version']}")
+    print(f" Features: {len(schema['feature_names'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# prediction_cache.py
+# Cache de predições por linha: LRU em memória com camada opcional em disco
+# (SQLite). A chave é o hash do vetor de features já normalizado e imputado
+# mais a versão do modelo, então o mesmo KOI enviado de novo (ou repetido no
+# mesmo lote) não é classificado nem explicado outra vez.
+
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# (probabilidades, contribuições da classe predita ou None)
+CacheEntry = Tuple[np.ndarray, Optional[np.ndarray]]
+
+# Máximo de parâmetros por consulta SQLite
+_SQLITE_BATCH = 500
+
+
+def row_keys(values: np.ndarray, model_version: str) -> List[bytes]:
+    """
+    Chaves de cache das linhas de uma matriz já imputada.
+
+    Args:
+        values: Matriz float (n_linhas x n_features)
+        model_version: Versão do modelo (do pacote)
+
+    Returns:
+        Lista com um digest por linha
+    """
+    # +0.0 normaliza -0.0 para 0.0 (mesmo valor, bytes diferentes)
+    values = np.ascontiguousarray(values, dtype=np.float64) + 0.0
+    prefix = model_version.encode()
+    return [
+        hashlib.blake2b(prefix + row.tobytes(), digest_size=16).digest()
+        for row in values
+    ]
+
+
+class PredictionCache:
+    """
+    LRU limitado em memória, com camada opcional em disco (SQLite).
+    Expõe contadores de acertos/falhas em stats().
+    """
+
+    def __init__(self, max_entries: int, disk_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+
+        self.disk_path = disk_path
+        self._db = None
+        self._db_pid = None
+        if disk_path:
+            db = self._connection()
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "key BLOB PRIMARY KEY, probabilities BLOB NOT NULL, contributions BLOB)"
+            )
+            db.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Uma conexão SQLite não pode ser compartilhada entre processos: depois
+        # de um fork (ex.: workers do gunicorn com preload) o filho abre a sua
+        if self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self.disk_path, check_same_thread=False, timeout=30)
+            self._db_pid = os.getpid()
+        return self._db
+
+    def get_many(self, keys: List[bytes], need_contributions: bool) -> Dict[bytes, CacheEntry]:
+        """
+        Busca várias chaves. Entradas sem contribuições não servem quando
+        `need_contributions` é True (contam como falha).
+        """
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and (entry[1] is not None or not need_contributions):
+                    self._entries.move_to_end(key)
+                    found[key] = entry
+            self._counters['hits'] += len(found)
+
+            pending = [key for key in keys if key not in found]
+            if pending and self.disk_path:
+                from_disk = self._read_disk(pending, need_contributions)
+                self._counters['disk_hits'] += len(from_disk)
+                for key, entry in from_disk.items():
+                    self._store(key, entry)
+                found.update(from_disk)
+
+            self._counters['misses'] += len(keys) - len(found)
+        return found
+
+    def put_many(self, entries: Dict[bytes, CacheEntry]):
+        with self._lock:
+            for key, entry in entries.items():
+                self._store(key, entry)
+            if self.disk_path and entries:
+                db = self._connection()
+                db.executemany(
+                    "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)",
+                    [
+                        (key, probs.astype(np.float64).tobytes(),
+                         None if contribs is None else contribs.astype(np.float64).tobytes())
+                        for key, (probs, contribs) in entries.items()
+                    ]
+                )
+                db.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['disk_hits'] + self._counters['misses']
+            return {
+                **self._counters,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hit_rate': (lookups - self._counters['misses']) / lookups if lookups else None,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def close(self):
+        """Fecha a conexão SQLite deste processo (reaberta se o cache voltar a ser usado)."""
+        with self._lock:
+            if self._db is not None and self._db_pid == os.getpid():
+                self._db.close()
+            self._db = None
+            self._db_pid = None
+
+    def _store(self, key: bytes, entry: CacheEntry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters['evictions'] += 1
+
+    def _read_disk(self, keys: List[bytes], need_contributions: bool) -> Dict[bytes, CacheEntry]:
+        found = {}
+        for start in range(0, len(keys), _SQLITE_BATCH):
+            batch = keys[start:start + _SQLITE_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            rows = self._connection().execute(
+                f"SELECT key, probabilities, contributions FROM predictions WHERE key IN ({placeholders})",
+                batch
+            )
+            for key, probs, contribs in rows:
+                if contribs is None and need_contributions:
+                    continue
+                found[key] = (
+                    np.frombuffer(probs, dtype=np.float64),
+                    None if contribs is None else np.frombuffer(contribs, dtype=np.float64)
+                )
+        return found
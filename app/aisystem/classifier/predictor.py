@@ -1,10 +1,99 @@
 # predictor.py
-import joblib
+import threading
+import multiprocessing
 import pandas as pd
 import numpy as np
-import xgboost as xgb
-import shap
-from typing import Dict, List, Optional
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Callable, Dict, Iterator, List, Optional
+
+try:
+    from .model_bundle import load_bundle
+    from .explainers import make_explainer
+    from .prediction_cache import PredictionCache, row_keys
+    from .input_formats import InputSource, count_input_rows, read_input, read_input_chunks
+    from .forest_evaluator import ArrayForest
+    from .instrumentation import stage, timed_iter
+except ImportError:
+    from model_bundle import load_bundle
+    from explainers import make_explainer
+    from prediction_cache import PredictionCache, row_keys
+    from input_formats import InputSource, count_input_rows, read_input, read_input_chunks
+    from forest_evaluator import ArrayForest
+    from instrumentation import stage, timed_iter
+
+# Linhas mínimas por fatia no modo paralelo (abaixo disso o custo de enviar
+# os dados ao processo supera o ganho)
+MIN_ROWS_PER_SHARD = 1000
+
+# Extensões de saída gravadas como Arrow IPC (Feather v2)
+ARROW_EXTENSIONS = ('.arrow', '.feather', '.ipc')
+
+# Backends de inferência das probabilidades: runtime do XGBoost ou avaliador
+# da floresta em NumPy puro (forest_evaluator.py)
+INFERENCE_BACKENDS = ('xgboost', 'numpy')
+
+# Níveis de explicação: sem SHAP, apenas as k features mais importantes, ou todas
+EXPLANATION_LEVELS = ('none', 'topk', 'full')
+
+# Colunas de probabilidade, na ordem das classes do modelo
+PROBABILITY_COLUMNS = ('prob_false_positive', 'prob_candidate', 'prob_confirmed')
+
+# Contadores de cache_stats somados entre os processos do pool
+CACHE_COUNTERS = ('hits', 'disk_hits', 'misses', 'evictions', 'deduplicated_rows')
+
+
+def _coerce_float(value, feature: str) -> float:
+    """
+    Converte um valor para float; None e textos inválidos viram NaN (faltantes).
+    
+    Raises:
+        ValueError: listas, objetos e booleanos (tipos JSON que não são números)
+    """
+    if value is None:
+        return np.nan
+    if isinstance(value, (bool, np.bool_, list, tuple, dict)):
+        raise ValueError(f"Valor não numérico para '{feature}': {value!r}")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class ArrowChunkWriter:
+    """
+    Grava blocos de resultados em um arquivo Parquet ou Arrow IPC (pela
+    extensão). O schema é fixado no primeiro bloco e os demais são
+    convertidos para ele.
+    """
+    
+    def __init__(self, output_file: str):
+        self.output_file = output_file
+        self.schema = None
+        self._writer = None
+    
+    def write(self, results_chunk: pd.DataFrame):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        table = pa.Table.from_pandas(results_chunk, preserve_index=False)
+        if self._writer is None:
+            # Colunas sem nenhum valor no primeiro bloco viram texto
+            self.schema = pa.schema([
+                field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                for field in table.schema
+            ])
+            if self.output_file.endswith(ARROW_EXTENSIONS):
+                self._writer = pa.ipc.new_file(self.output_file, self.schema)
+            else:
+                self._writer = pq.ParquetWriter(self.output_file, self.schema)
+        self._writer.write_table(table.cast(self.schema))
+    
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
 
 class ExoplanetPredictor:
     """
@@ -12,30 +101,62 @@ class ExoplanetPredictor:
     Lida com dados faltantes e fornece análise de importância.
     """
     
-    def __init__(self, model_path: str, training_data_path: str):
+    def __init__(self, bundle_path: str, n_workers: int = 1, explainer_backend: str = 'shap',
+                 cache_size: int = 0, cache_path: Optional[str] = None,
+                 inference_backend: str = 'xgboost', n_threads: int = 0):
         """
         Inicializa o preditor.
         
         Args:
-            model_path: Caminho para o modelo treinado (.joblib)
-            training_data_path: Caminho para dados de treino (para SHAP)
+            bundle_path: Diretório do pacote do modelo (gerado por model_bundle.py)
+            n_workers: Processos usados para classificar lotes grandes em paralelo
+                (1 = tudo no processo atual)
+            explainer_backend: Backend das contribuições SHAP: 'shap'
+                (shap.TreeExplainer) ou 'xgboost' (pred_contribs nativo do booster)
+            cache_size: Linhas mantidas no cache LRU de predições (0 = sem cache)
+            cache_path: Arquivo SQLite da camada em disco do cache (opcional)
+            inference_backend: Cálculo das probabilidades: 'xgboost' (runtime
+                nativo) ou 'numpy' (árvores achatadas em arrays, sem chamar o XGBoost)
+            n_threads: Threads do XGBoost por chamada (0 = padrão do XGBoost,
+                todos os núcleos). Com vários workers no mesmo host, dividir os núcleos
         """
-        self.model = joblib.load(model_path)
+        if inference_backend not in INFERENCE_BACKENDS:
+            raise ValueError(
+                f"Backend de inferência inválido: {inference_backend} (use {', '.join(INFERENCE_BACKENDS)})"
+            )
+        
+        self.bundle_path = bundle_path
+        self.n_workers = max(1, int(n_workers))
+        self.explainer_backend = explainer_backend
+        self.cache_size = cache_size
+        self.cache_path = cache_path
+        self.inference_backend = inference_backend
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        # Contadores de cache acumulados pelos processos do pool
+        self._pool_counters = dict.fromkeys(CACHE_COUNTERS, 0)
+        
+        self.model, schema = load_bundle(bundle_path)
+        if n_threads:
+            self.model.set_params(n_jobs=int(n_threads))
+        self.model_version = schema["model_version"]
+        self.forest = ArrayForest(self.model) if inference_backend == 'numpy' else None
         
-        # Carregar dados de treino para calcular SHAP values
-        df_train = pd.read_csv(training_data_path)
-        self.X_train = df_train.drop(columns=["koi_disposition_num"])
-        self.feature_names = self.X_train.columns.tolist()
+        # Schema pré-calculado: ordem das features, dtypes e medianas do treino
+        self.feature_names = schema["feature_names"]
+        self.feature_dtypes = schema["feature_dtypes"]
+        self.feature_medians = pd.Series(schema["feature_medians"])[self.feature_names]
+        self._median_values = self.feature_medians.to_numpy(dtype=float)
         
-        # Inicializar SHAP explainer
-        self.explainer = shap.TreeExplainer(self.model)
+        # Inicializar backend de explicação (SHAP)
+        self.explainer = make_explainer(explainer_backend, self.model)
         
         # Labels das classes
-        self.class_labels = {
-            0: "FALSE POSITIVE",
-            1: "CANDIDATE",
-            2: "CONFIRMED"
-        }
+        self.class_labels = schema["class_labels"]
+        
+        # Cache de predições por linha (chave: features imputadas + versão do modelo)
+        self.cache = PredictionCache(cache_size, cache_path) if cache_size > 0 or cache_path else None
+        self.deduplicated_rows = 0
     
     def preprocess_input(self, user_data: Dict[str, Optional[float]]) -> pd.DataFrame:
         """
@@ -47,192 +168,546 @@ class ExoplanetPredictor:
         Returns:
             DataFrame processado
         """
-        # Criar DataFrame com todas as features esperadas
-        input_df = pd.DataFrame([user_data])
+        return self.preprocess_records([user_data])
+    
+    def preprocess_records(self, records: List[Dict[str, Optional[float]]]) -> pd.DataFrame:
+        """
+        Processa uma lista de dicionários direto em uma matriz NumPy (sem
+        conversões coluna a coluna do pandas), para requisições pequenas.
         
-        # Adicionar features faltantes com None
-        for feature in self.feature_names:
-            if feature not in input_df.columns:
-                input_df[feature] = None
+        Args:
+            records: Lista de dicionários com features e valores
         
-        # Ordenar colunas na ordem correta
-        input_df = input_df[self.feature_names]
+        Returns:
+            DataFrame processado (uma linha por dicionário)
+        """
+        return self._impute_records(records)[0]
+    
+    def _impute_records(self, records: List[Dict[str, Optional[float]]]):
+        # (DataFrame imputado, máscara n_linhas x n_features dos valores estimados)
+        values = np.array(
+            [[_coerce_float(record.get(feature), feature) for feature in self.feature_names] for record in records],
+            dtype=float
+        ).reshape(len(records), len(self.feature_names))
         
-        for col in input_df.columns:
-            # Tentar converter para numérico, transformando erros em NaN
-            input_df[col] = pd.to_numeric(input_df[col], errors='coerce')
-
         # Preencher valores faltantes com a mediana do treino
-        for col in input_df.columns:
-            if input_df[col].isna().any():
-                median_value = self.X_train[col].median()
-                input_df[col].fillna(median_value, inplace=True)
+        missing = np.isnan(values)
+        values[missing] = np.broadcast_to(self._median_values, values.shape)[missing]
         
-        return input_df
+        return pd.DataFrame(values, columns=self.feature_names), missing
     
-    def predict_with_explanation(self, user_data: Dict[str, Optional[float]]) -> Dict:
+    def preprocess_frame(self, df: pd.DataFrame):
+        """
+        Processa um DataFrame inteiro de uma vez (versão vetorizada de preprocess_input).
+        
+        Args:
+            df: DataFrame com as features (colunas extras são ignoradas)
+        
+        Returns:
+            Tupla (X, missing_mask): matriz imputada na ordem do modelo e
+            máscara booleana (n_linhas x n_features) dos valores estimados
+        """
+        # Converter para numérico e reordenar; features ausentes viram NaN
+        X = df.reindex(columns=self.feature_names).apply(pd.to_numeric, errors='coerce')
+        X = X.astype(float)
+        missing_mask = X.isna().to_numpy()
+        
+        # Preencher valores faltantes com a mediana do treino (uma vez por coluna)
+        if missing_mask.any():
+            X = X.fillna(self.feature_medians)
+        
+        return X, missing_mask
+    
+    def _shap_for_predicted_class(self, X: pd.DataFrame, predictions: np.ndarray) -> np.ndarray:
+        """
+        Calcula os SHAP values de uma matriz e seleciona os da classe predita.
+        
+        Args:
+            X: DataFrame já processado
+            predictions: Classe predita de cada linha
+        
+        Returns:
+            Array (n_linhas x n_features) com a contribuição de cada feature
+        """
+        with stage('shap', len(X)):
+            shap_values = self.explainer.contributions(X)
+        
+        if shap_values.ndim == 2:
+            # Binário ou regressão: array único
+            return shap_values
+        
+        # Multi-classe: (n_linhas x n_features x n_classes)
+        rows = np.arange(len(predictions))
+        return shap_values[rows, :, predictions]
+    
+    def predict_with_explanation(self, user_data: Dict[str, Optional[float]],
+                                 explanation: str = 'topk', top_k: int = 10) -> Dict:
         """
         Faz predição e retorna explicação detalhada.
         
         Args:
             user_data: Dicionário com dados do usuário
+            explanation: 'none' (sem SHAP), 'topk' (as top_k features mais
+                importantes) ou 'full' (todas as features, ordenadas)
+            top_k: Quantas features retornar no modo 'topk'
         
         Returns:
             Dicionário com predição, probabilidades e explicação
         """
-        # Processar entrada
-        X_input = self.preprocess_input(user_data)
+        return self.predict_records([user_data], explanation, top_k)[0]
+    
+    def predict_records(self, records: List[Dict[str, Optional[float]]],
+                        explanation: str = 'topk', top_k: int = 10) -> List[Dict]:
+        """
+        Predição com explicação para alguns KOIs de uma vez (uma única chamada
+        ao modelo e ao SHAP), sem arquivos intermediários.
         
-        # Fazer predição
-        prediction = self.model.predict(X_input)[0]
-        probabilities = self.model.predict_proba(X_input)[0]
+        Args:
+            records: Lista de dicionários com dados do usuário
+            explanation: 'none', 'topk' ou 'full' (ver predict_with_explanation)
+            top_k: Quantas features retornar no modo 'topk'
         
-        # Calcular SHAP values (explicação)
-        shap_values = self.explainer.shap_values(X_input)
+        Returns:
+            Lista de dicionários no formato de predict_with_explanation
         
-        # Tratar diferentes formatos de SHAP values
-        if isinstance(shap_values, list):
-            # Multi-classe: lista de arrays
-            shap_values_class = shap_values[int(prediction)]
-        else:
-            # Binário ou regressão: array único
-            shap_values_class = shap_values
-        
-        # Achatar o array se necessário
-        if isinstance(shap_values_class, np.ndarray):
-            if len(shap_values_class.shape) > 1:
-                shap_values_class = shap_values_class.flatten()
-        
-        # Obter features mais importantes para a predição
-        feature_importance = []
-        for i, feature in enumerate(self.feature_names):
-            # Extrair valor do SHAP de forma segura
-            if isinstance(shap_values_class, np.ndarray):
-                importance_val = shap_values_class[i]
-            else:
-                importance_val = shap_values_class[0][i]
+        Raises:
+            ValueError: explicação inválida, valor não numérico (lista, objeto,
+                booleano) ou infinito na entrada
+        """
+        self._check_explanation(explanation, top_k)
+        if not records:
+            return []
+        
+        # Processar entrada
+        with stage('impute', len(records)):
+            X_input, missing = self._impute_records(records)
+        values = X_input.to_numpy()
+        infinite = ~np.isfinite(values)
+        if infinite.any():
+            feature = self.feature_names[infinite.any(axis=0).argmax()]
+            raise ValueError(f"Valor infinito ou grande demais na entrada ('{feature}')")
+        
+        # Fazer predição e calcular SHAP values (explicação), com cache
+        probabilities, shap_values_class = self._score_matrix(X_input, explanation)
+        predictions = probabilities.argmax(axis=1)
+        with stage('rank', len(records)):
+            order = (
+                self._rank_features(shap_values_class, explanation, top_k)
+                if explanation != 'none' else None
+            )
+        
+        results = []
+        for row in range(len(records)):
+            prediction = int(predictions[row])
             
-            # Converter para float nativo do Python
-            importance = float(np.asarray(importance_val).item())
-            value = float(X_input.iloc[0][feature])
-            was_missing = feature not in user_data or user_data[feature] is None
+            # Obter features mais importantes para a predição
+            feature_importance = []
+            if order is not None:
+                for i in order[row]:
+                    feature = self.feature_names[i]
+                    # Converter para float nativo do Python
+                    importance = float(shap_values_class[row, i])
+                    was_missing = bool(missing[row, i])
+                    
+                    feature_importance.append({
+                        'feature': feature,
+                        'value': float(values[row, i]),
+                        'importance': importance,
+                        'was_missing': was_missing,
+                        'abs_importance': abs(importance)
+                    })
             
-            feature_importance.append({
-                'feature': feature,
-                'value': value,
-                'importance': importance,
-                'was_missing': was_missing,
-                'abs_importance': abs(importance)
+            results.append({
+                'prediction': prediction,
+                'prediction_label': self.class_labels[prediction],
+                'probabilities': {
+                    self.class_labels[i]: float(prob) 
+                    for i, prob in enumerate(probabilities[row])
+                },
+                'confidence': float(probabilities[row, prediction]),
+                'top_features': feature_importance,
+                'missing_features': [f for f, estimated in zip(self.feature_names, missing[row]) if estimated]
             })
         
-        # Ordenar por importância absoluta
-        feature_importance.sort(key=lambda x: float(x['abs_importance']), reverse=True)
+        return results
+    
+    def predict_frame(self, df: pd.DataFrame, explanation: str = 'topk', top_k: int = 3) -> pd.DataFrame:
+        """
+        Classifica e explica todas as linhas de um DataFrame em chamadas únicas
+        ao modelo e ao SHAP (motor vetorizado usado por predict_batch).
+        Com n_workers > 1, lotes grandes são divididos entre processos.
         
-        # Criar explicação em texto
-
+        Args:
+            df: DataFrame com os dados dos exoplanetas
+            explanation: Nível de explicação: 'none' (só predição e probabilidades),
+                'topk' (as top_k features mais importantes) ou 'full' (todas)
+            top_k: Quantas features mais importantes reportar por linha no modo 'topk'
         
-        return {
-            'prediction': int(prediction),
-            'prediction_label': self.class_labels[prediction],
-            'probabilities': {
-                self.class_labels[i]: float(prob) 
-                for i, prob in enumerate(probabilities)
-            },
-            'confidence': float(probabilities[prediction]),
-            'top_features': feature_importance[:10],
-            'missing_features': [f for f in user_data if user_data[f] is None]
+        Returns:
+            DataFrame com uma linha de resultado por linha de entrada
+            (mesmas colunas de predict_batch, sem os dados originais)
+        """
+        self._check_explanation(explanation, top_k)
+        
+        n_shards = min(self.n_workers, len(df) // MIN_ROWS_PER_SHARD)
+        if n_shards > 1:
+            return self._predict_frame_parallel(df, explanation, top_k, n_shards)
+        return self._predict_frame_local(df, explanation, top_k)
+    
+    def _predict_frame_parallel(self, df: pd.DataFrame, explanation: str, top_k: int, n_shards: int) -> pd.DataFrame:
+        """
+        Divide o DataFrame em fatias contíguas, classifica cada uma em um
+        processo do pool e remonta os resultados na ordem original.
+        """
+        bounds = np.linspace(0, len(df), n_shards + 1, dtype=int)
+        shards = [df.iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+        
+        # map preserva a ordem das fatias
+        frames = []
+        for results, counters in self._get_pool().map(_predict_shard, shards, repeat(explanation), repeat(top_k)):
+            frames.append(results)
+            with self._pool_lock:
+                for key, value in counters.items():
+                    self._pool_counters[key] += value
+        return pd.concat(frames, ignore_index=True)
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """
+        Cria (uma vez) o pool de processos; cada processo carrega o modelo
+        uma única vez no inicializador.
+        """
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: fork com threads do OpenMP/XGBoost ativas pode travar
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.n_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(self.bundle_path, self.explainer_backend, self.cache_size, self.cache_path,
+                              self.inference_backend)
+                )
+            return self._pool
+    
+    def close(self):
+        """
+        Encerra o pool de processos (se houver) e fecha o cache em disco.
+        """
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+        if self.cache is not None:
+            self.cache.close()
+    
+    def _predict_frame_local(self, df: pd.DataFrame, explanation: str, top_k: int) -> pd.DataFrame:
+        """
+        Motor vetorizado executado no processo atual.
+        """
+        if len(df) == 0:
+            return self._result_frame({'id': df.index}, explanation, top_k)
+        
+        with stage('impute', len(df)):
+            X, missing_mask = self.preprocess_frame(df)
+        
+        # Valores infinitos fazem o XGBoost rejeitar o lote inteiro:
+        # separar essas linhas antes de chamar o modelo
+        invalid = ~np.isfinite(X.to_numpy()).all(axis=1)
+        if invalid.any():
+            return self._predict_excluding_rows(df, invalid, explanation, top_k)
+        
+        try:
+            probabilities, contributions = self._score_matrix(X, explanation)
+            predictions = probabilities.argmax(axis=1)
+        except Exception as e:
+            if len(df) == 1:
+                print(f"Erro na linha {df.index[0]}: {e}")
+                return self._error_frame(df.index, str(e), explanation, top_k)
+            # Alguma linha invalida o lote inteiro: dividir ao meio até
+            # isolar e reportar apenas as linhas com erro
+            mid = len(df) // 2
+            return pd.concat([
+                self._predict_frame_local(df.iloc[:mid], explanation, top_k),
+                self._predict_frame_local(df.iloc[mid:], explanation, top_k)
+            ], ignore_index=True)
+        
+        rows = np.arange(len(X))
+        
+        label_array = np.asarray([self.class_labels[c] for c in range(probabilities.shape[1])], dtype=object)
+        
+        results = {
+            'id': df.index.to_numpy(),
+            'prediction': predictions,
+            'prediction_label': label_array[predictions],
+            'confidence': probabilities[rows, predictions],
         }
+        for i, column in enumerate(PROBABILITY_COLUMNS):
+            results[column] = probabilities[:, i]
+        if explanation != 'none':
+            with stage('rank', len(df)):
+                order = self._rank_features(contributions, explanation, top_k)
+            feature_array = np.asarray(self.feature_names, dtype=object)
+            for k in range(order.shape[1]):
+                results[f'top_feature_{k + 1}'] = feature_array[order[:, k]]
+                results[f'top_feature_{k + 1}_importance'] = contributions[rows, order[:, k]]
+        results['missing_features_count'] = missing_mask.sum(axis=1)
+        results['error'] = None
+        
+        return self._result_frame(results, explanation, top_k)
     
-    def predict_batch(self, input_file: str, output_file: str = None) -> pd.DataFrame:
+    def result_columns(self, explanation: str = 'topk', top_k: int = 3) -> List[str]:
         """
-        Faz predições em lote a partir de um arquivo CSV ou Excel.
+        Colunas de resultado de predict_frame (sem os dados originais), as
+        mesmas para linhas classificadas, com erro ou lotes vazios.
         
         Args:
-            input_file: Caminho para arquivo CSV ou Excel com os dados
+            explanation: Nível de explicação ('none', 'topk' ou 'full')
+            top_k: Features mais importantes por linha no modo 'topk'
+        
+        Returns:
+            Lista com os nomes das colunas, na ordem da saída
+        """
+        if explanation == 'none':
+            n_top = 0
+        elif explanation == 'full':
+            n_top = len(self.feature_names)
+        else:
+            n_top = min(top_k, len(self.feature_names))
+        
+        columns = ['id', 'prediction', 'prediction_label', 'confidence', *PROBABILITY_COLUMNS]
+        for k in range(1, n_top + 1):
+            columns += [f'top_feature_{k}', f'top_feature_{k}_importance']
+        return columns + ['missing_features_count', 'error']
+    
+    def _result_frame(self, columns: Dict, explanation: str, top_k: int) -> pd.DataFrame:
+        # Resultados com todas as colunas de result_columns (as ausentes ficam vazias)
+        return pd.DataFrame(columns).reindex(columns=self.result_columns(explanation, top_k))
+    
+    def _score_matrix(self, X: pd.DataFrame, explanation: str):
+        """
+        Probabilidades e contribuições SHAP (classe predita) de uma matriz já
+        processada. Cada linha distinta é calculada uma única vez e o cache,
+        se ativo, é consultado antes do modelo.
+        
+        Returns:
+            Tupla (probabilidades, contribuições ou None se explanation == 'none')
+        """
+        need_contributions = explanation != 'none'
+        
+        # Sem cache e sem SHAP, deduplicar custa mais do que predizer
+        if self.cache is None and not need_contributions:
+            return self._predict_proba(X), None
+        
+        with stage('cache', len(X)):
+            keys = row_keys(X.to_numpy(), self.model_version)
+            codes, unique_keys = pd.factorize(pd.Series(keys, dtype=object))
+            # Posição da primeira ocorrência de cada linha distinta
+            first_rows = np.unique(codes, return_index=True)[1]
+            self.deduplicated_rows += len(keys) - len(unique_keys)
+            
+            cached = self.cache.get_many(list(unique_keys), need_contributions) if self.cache else {}
+        
+        probabilities = np.empty((len(unique_keys), len(self.class_labels)))
+        contributions = np.empty((len(unique_keys), len(self.feature_names))) if need_contributions else None
+        
+        pending = []
+        for i, key in enumerate(unique_keys):
+            entry = cached.get(key)
+            if entry is None:
+                pending.append(i)
+                continue
+            probabilities[i] = entry[0]
+            if need_contributions:
+                contributions[i] = entry[1]
+        
+        if pending:
+            X_pending = X.iloc[first_rows[pending]]
+            pending_probabilities = self._predict_proba(X_pending)
+            probabilities[pending] = pending_probabilities
+            if need_contributions:
+                contributions[pending] = self._shap_for_predicted_class(
+                    X_pending, pending_probabilities.argmax(axis=1)
+                )
+            
+            if self.cache:
+                with stage('cache'):
+                    self.cache.put_many({
+                        unique_keys[i]: (
+                            probabilities[i].copy(),
+                            contributions[i].copy() if need_contributions else None
+                        )
+                        for i in pending
+                    })
+        
+        return probabilities[codes], (contributions[codes] if need_contributions else None)
+    
+    def _predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        """
+        Probabilidades por classe via inplace_predict do booster, direto da
+        matriz NumPy (evita montar uma DMatrix a partir do DataFrame, que
+        domina o tempo em lotes de uma linha), ou pelo avaliador NumPy.
+        """
+        with stage('predict_proba', len(X)):
+            if self.forest is not None:
+                return self.forest.predict_proba(X)
+            
+            probabilities = self.model.get_booster().inplace_predict(
+                np.ascontiguousarray(X.to_numpy(dtype=np.float32))
+            )
+        # Modelos binários devolvem só a probabilidade da classe positiva
+        if probabilities.ndim == 1:
+            probabilities = np.column_stack([1 - probabilities, probabilities])
+        return probabilities
+    
+    def warm_up(self, predict: bool = True):
+        """
+        Faz uma predição com explicação de um KOI fictício (só medianas), sem
+        passar pelo cache, para que o custo da primeira chamada (import do
+        shap, criação do explicador, threads do XGBoost) não caia sobre a
+        primeira requisição real.
+        
+        Args:
+            predict: Se False, só prepara o explicador, sem rodar o modelo.
+                Usado antes de um fork (gunicorn com preload): fork com threads
+                do OpenMP/XGBoost ativas pode travar
+        """
+        self.explainer.prepare()
+        if not predict:
+            return
+        
+        X = self.preprocess_records([{}])
+        probabilities = self._predict_proba(X)
+        self._shap_for_predicted_class(X, probabilities.argmax(axis=1))
+    
+    def cache_stats(self) -> Dict:
+        """
+        Contadores do cache de predições e linhas duplicadas aproveitadas,
+        somando os dos processos do pool (modo paralelo). size e max_entries
+        são os do cache deste processo.
+        """
+        stats = self.cache.stats() if self.cache else {'enabled': False}
+        stats['deduplicated_rows'] = self.deduplicated_rows
+        with self._pool_lock:
+            pool_counters = dict(self._pool_counters)
+        for key, value in pool_counters.items():
+            if key in stats:
+                stats[key] += value
+        if self.cache:
+            lookups = stats['hits'] + stats['disk_hits'] + stats['misses']
+            stats['hit_rate'] = (lookups - stats['misses']) / lookups if lookups else None
+        return stats
+    
+    @staticmethod
+    def _check_explanation(explanation: str, top_k: int):
+        if explanation not in EXPLANATION_LEVELS:
+            raise ValueError(f"Nível de explicação inválido: {explanation} (use {', '.join(EXPLANATION_LEVELS)})")
+        if explanation == 'topk' and top_k < 1:
+            raise ValueError("top_k deve ser pelo menos 1")
+    
+    @staticmethod
+    def _rank_features(contributions: np.ndarray, explanation: str, top_k: int) -> np.ndarray:
+        """
+        Índices das features por |SHAP| decrescente, uma linha por amostra.
+        
+        No modo 'topk' as k maiores são selecionadas com argpartition (O(n))
+        e só elas são ordenadas; no modo 'full' todas são ordenadas.
+        """
+        magnitude = -np.abs(contributions)
+        n_features = magnitude.shape[1]
+        
+        if explanation == 'full' or top_k >= n_features:
+            return np.argsort(magnitude, axis=1, kind='stable')
+        
+        candidates = np.argpartition(magnitude, top_k - 1, axis=1)[:, :top_k]
+        candidate_values = np.take_along_axis(magnitude, candidates, axis=1)
+        within = np.argsort(candidate_values, axis=1, kind='stable')
+        return np.take_along_axis(candidates, within, axis=1)
+    
+    def _predict_excluding_rows(self, df: pd.DataFrame, invalid: np.ndarray, explanation: str, top_k: int) -> pd.DataFrame:
+        """
+        Classifica as linhas válidas e marca as inválidas como erro,
+        mantendo a ordem original das linhas.
+        """
+        for idx in df.index[invalid]:
+            print(f"Erro na linha {idx}: valor infinito na entrada")
+        
+        results = pd.concat([
+            self._predict_frame_local(df[~invalid], explanation, top_k),
+            self._error_frame(df.index[invalid], "Valor infinito ou grande demais na entrada", explanation, top_k)
+        ], ignore_index=True)
+        
+        results.index = np.concatenate([np.flatnonzero(~invalid), np.flatnonzero(invalid)])
+        return results.sort_index().reset_index(drop=True)
+    
+    def _error_frame(self, index: pd.Index, message: str, explanation: str, top_k: int) -> pd.DataFrame:
+        """
+        Linhas de resultado para entradas que não puderam ser classificadas
+        (mesmas colunas das linhas classificadas, sem probabilidades).
+        """
+        return self._result_frame({
+            'id': index,
+            'prediction': None,
+            'prediction_label': 'ERRO',
+            'confidence': 0,
+            'error': message
+        }, explanation, top_k)
+    
+    def predict_batch(self, input_file: InputSource, output_file: str = None,
+                      explanation: str = 'topk', top_k: int = 3) -> pd.DataFrame:
+        """
+        Faz predições em lote a partir de um arquivo CSV, Excel, Parquet ou Arrow IPC.
+        
+        Args:
+            input_file: Caminho, bytes ou objeto tipo arquivo (ex.: upload) com
+                os dados em CSV, Excel, Parquet ou Arrow IPC; o formato é
+                detectado pelo conteúdo
             output_file: Caminho para salvar resultados (opcional)
+            explanation: Nível de explicação ('none', 'topk' ou 'full')
+            top_k: Features mais importantes por linha no modo 'topk'
         
         Returns:
             DataFrame com predições e explicações
         """
         # Ler arquivo (detecta automaticamente CSV ou Excel)
-        if input_file.endswith('.csv'):
-            df = pd.read_csv(input_file)
-        elif input_file.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(input_file)
-        else:
-            raise ValueError("Arquivo deve ser CSV ou Excel (.xlsx, .xls)")
+        with stage('parse') as timer:
+            df = read_input(input_file)
+            timer.rows = len(df)
         
         # Limpar dados: converter tudo para numérico onde possível
         print("Limpando dados não numéricos...")
-        original_shape = df.shape
         
-        for col in df.columns:
-            if col in self.feature_names:
-                # Converter para numérico, transformando erros em NaN
-                df[col] = pd.to_numeric(df[col], errors='coerce')
+        with stage('coerce', len(df)):
+            for col in df.columns:
+                if col in self.feature_names:
+                    # Converter para numérico, transformando erros em NaN
+                    df[col] = pd.to_numeric(df[col], errors='coerce')
         
         # Contar quantos valores foram convertidos para NaN
-        nan_count = df[self.feature_names].isna().sum().sum()
+        present = [f for f in self.feature_names if f in df.columns]
+        nan_count = df[present].isna().sum().sum()
         if nan_count > 0:
             print(f" {nan_count} valores não numéricos encontrados e serão estimados")
         
-        results = []
-        
         print(f"Processando {len(df)} exoplanetas...")
         
-        for idx, row in df.iterrows():
-            # Converter linha para dicionário
-            user_data = row.to_dict()
-            
-            # Fazer predição
-            try:
-                result = self.predict_with_explanation(user_data)
-                
-                # Adicionar informações básicas
-                result_row = {
-                    'id': idx,
-                    'prediction': result['prediction'],
-                    'prediction_label': result['prediction_label'],
-                    'confidence': result['confidence'],
-                    'prob_false_positive': result['probabilities']['FALSE POSITIVE'],
-                    'prob_candidate': result['probabilities']['CANDIDATE'],
-                    'prob_confirmed': result['probabilities']['CONFIRMED'],
-                    'top_feature_1': result['top_features'][0]['feature'],
-                    'top_feature_1_importance': result['top_features'][0]['importance'],
-                    'top_feature_2': result['top_features'][1]['feature'],
-                    'top_feature_2_importance': result['top_features'][1]['importance'],
-                    'top_feature_3': result['top_features'][2]['feature'],
-                    'top_feature_3_importance': result['top_features'][2]['importance'],
-                    'missing_features_count': len(result['missing_features'])
-                }
-                
-                results.append(result_row)
-                
-                if (idx + 1) % 100 == 0:
-                    print(f"Processados {idx + 1}/{len(df)}...")
-                    
-            except Exception as e:
-                print(f"Erro na linha {idx}: {e}")
-                results.append({
-                    'id': idx,
-                    'prediction': None,
-                    'prediction_label': 'ERRO',
-                    'confidence': 0,
-                    'error': str(e)
-                })
-        
-        # Converter para DataFrame
-        results_df = pd.DataFrame(results)
+        # Classificar o arquivo inteiro de uma vez
+        results_df = self.predict_frame(df, explanation, top_k)
         
         # Adicionar dados originais
         results_df = pd.concat([df.reset_index(drop=True), results_df], axis=1)
         
         # Salvar se especificado
         if output_file:
-            if output_file.endswith('.csv'):
-                results_df.to_csv(output_file, index=False)
-            else:
-                results_df.to_excel(output_file, index=False)
+            with stage('write', len(results_df)):
+                if output_file.endswith('.csv'):
+                    results_df.to_csv(output_file, index=False)
+                elif output_file.endswith('.parquet'):
+                    results_df.to_parquet(output_file, index=False)
+                elif output_file.endswith(ARROW_EXTENSIONS):
+                    writer = ArrowChunkWriter(output_file)
+                    writer.write(results_df)
+                    writer.close()
+                else:
+                    results_df.to_excel(output_file, index=False)
             print(f"\nResultados salvos em: {output_file}")
         
         print(f"\n✓ Processamento concluído!")
@@ -240,6 +715,175 @@ class ExoplanetPredictor:
         
         return results_df
     
+    @staticmethod
+    def count_input_rows(input_file: InputSource) -> Optional[int]:
+        """
+        Estima o número de linhas de dados do arquivo sem carregá-lo
+        (usado para reportar progresso). Retorna None se não for possível.
+        """
+        return count_input_rows(input_file)
+    
+    def _normalize_result_chunk(self, chunk: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+        """
+        Fixa colunas e tipos de um bloco de resultados para que todos os blocos
+        tenham o mesmo schema ao serem anexados ao arquivo de saída.
+        """
+        chunk = chunk.reindex(columns=columns)
+        present = [f for f in self.feature_names if f in chunk.columns]
+        chunk[present] = chunk[present].astype(float)
+        chunk['prediction'] = chunk['prediction'].astype('Int64')
+        chunk['missing_features_count'] = chunk['missing_features_count'].astype('Int64')
+        chunk['error'] = chunk['error'].astype(object)
+        return chunk
+    
+    def predict_batch_chunks(self, input_file: InputSource, chunksize: int = 50_000,
+                             explanation: str = 'topk', top_k: int = 3,
+                             features_only: bool = False) -> Iterator[pd.DataFrame]:
+        """
+        Gerador de predições em lote: lê, classifica e devolve um bloco por vez,
+        mantendo a memória limitada ao tamanho do bloco.
+        
+        Args:
+            input_file: Caminho, bytes ou objeto tipo arquivo (CSV, Excel,
+                Parquet ou Arrow IPC)
+            chunksize: Número de linhas por bloco
+            explanation: Nível de explicação ('none', 'topk' ou 'full')
+            top_k: Features mais importantes por linha no modo 'topk'
+            features_only: Ler só as colunas de features do modelo (as demais
+                colunas da entrada não são lidas nem repetidas na saída)
+        
+        Yields:
+            DataFrames com os dados originais do bloco e as colunas de
+            resultado, todos com as mesmas colunas; uma entrada sem linhas
+            não produz nenhum bloco
+        """
+        columns = self.feature_names if features_only else None
+        result_columns = self.result_columns(explanation, top_k)
+        input_columns = None
+        for chunk in timed_iter('parse', read_input_chunks(input_file, chunksize, columns)):
+            if input_columns is None:
+                # Colunas da entrada fixadas pelo primeiro bloco; colunas com nome
+                # de resultado (ex.: saída de uma classificação anterior) são substituídas
+                input_columns = [col for col in chunk.columns if col not in result_columns]
+            if len(chunk) == 0:
+                continue
+            chunk = chunk.reindex(columns=input_columns)
+            with stage('coerce', len(chunk)):
+                for col in chunk.columns:
+                    if col in self.feature_names:
+                        chunk[col] = pd.to_numeric(chunk[col], errors='coerce')
+            
+            results = self.predict_frame(chunk, explanation, top_k)
+            results_chunk = pd.concat([chunk.reset_index(drop=True), results], axis=1)
+            yield self._normalize_result_chunk(results_chunk, input_columns + result_columns)
+    
+    def predict_batch_streaming(self, input_file: InputSource, output_file: str,
+                                chunksize: int = 50_000,
+                                progress_callback: Optional[Callable[[int], None]] = None,
+                                explanation: str = 'topk', top_k: int = 3,
+                                features_only: bool = False) -> Dict:
+        """
+        Faz predições em lote em modo streaming, anexando cada bloco ao arquivo
+        de saída (CSV, Parquet ou Arrow IPC) assim que é classificado.
+        
+        Args:
+            input_file: Caminho, bytes ou objeto tipo arquivo (CSV, Excel,
+                Parquet ou Arrow IPC)
+            output_file: Caminho do arquivo de saída (.csv, .parquet, .arrow/.feather)
+            chunksize: Número de linhas por bloco
+            progress_callback: Chamado com o total de linhas processadas após cada bloco
+            explanation: Nível de explicação ('none', 'topk' ou 'full')
+            top_k: Features mais importantes por linha no modo 'topk'
+            features_only: Ler só as colunas de features do modelo
+        
+        Returns:
+            Estatísticas agregadas (ver summarize_results), sem manter os
+            resultados em memória
+        """
+        if not output_file.endswith(('.csv', '.parquet') + ARROW_EXTENSIONS):
+            raise ValueError("Modo streaming grava apenas CSV, Parquet ou Arrow IPC (.csv, .parquet, .arrow, .feather)")
+        
+        stats = None
+        arrow_writer = None if output_file.endswith('.csv') else ArrowChunkWriter(output_file)
+        
+        print(f"Processando {input_file} em blocos de {chunksize} linhas...")
+        
+        try:
+            for results_chunk in self.predict_batch_chunks(input_file, chunksize, explanation, top_k,
+                                                           features_only):
+                with stage('write', len(results_chunk)):
+                    if output_file.endswith('.csv'):
+                        results_chunk.to_csv(output_file, index=False,
+                                             mode='w' if stats is None else 'a',
+                                             header=stats is None)
+                    else:
+                        arrow_writer.write(results_chunk)
+                
+                stats = self.summarize_results(results_chunk, stats)
+                print(f"Processados {stats['total']}...")
+                if progress_callback:
+                    progress_callback(stats['total'])
+        finally:
+            if arrow_writer is not None:
+                arrow_writer.close()
+        
+        if stats is None:
+            # Entrada sem linhas: arquivo de saída vazio, sem nenhum resultado
+            if arrow_writer is None:
+                open(output_file, 'w').close()
+            else:
+                arrow_writer.write(self._normalize_result_chunk(
+                    pd.DataFrame(), self.result_columns(explanation, top_k)
+                ))
+                arrow_writer.close()
+            stats = self.summarize_results(pd.DataFrame(columns=['prediction_label', 'confidence']))
+        
+        print(f"\nResultados salvos em: {output_file}")
+        print(f"\n✓ Processamento concluído!")
+        print(f"Total: {stats['total']} | Sucesso: {stats['total'] - stats['errors']} | Erros: {stats['errors']}")
+        
+        return stats
+    
+    @staticmethod
+    def summarize_results(results_df: pd.DataFrame, stats: Optional[Dict] = None) -> Dict:
+        """
+        Agrega as estatísticas usadas no relatório. Pode ser chamado bloco a
+        bloco, passando o resultado anterior em `stats`.
+        
+        Args:
+            results_df: DataFrame (ou bloco) retornado por predict_batch
+            stats: Estatísticas acumuladas dos blocos anteriores (opcional)
+        
+        Returns:
+            Dicionário com totais, contagens por classe e somas de confiança
+        """
+        if stats is None:
+            stats = {
+                'total': 0,
+                'errors': 0,
+                'confidence_sum': 0.0,
+                'label_counts': Counter(),
+                'label_confidence_sum': Counter(),
+                'top_feature_counts': Counter(),
+                'label_top_feature_counts': {},
+            }
+        
+        labels = results_df['prediction_label']
+        confidence = results_df['confidence'].astype(float)
+        
+        stats['total'] += len(results_df)
+        stats['errors'] += int((labels == 'ERRO').sum())
+        stats['confidence_sum'] += float(confidence.sum())
+        stats['label_counts'].update(labels.value_counts().to_dict())
+        stats['label_confidence_sum'].update(confidence.groupby(labels).sum().to_dict())
+        # Sem colunas de features quando a explicação é 'none'
+        if 'top_feature_1' in results_df.columns:
+            stats['top_feature_counts'].update(results_df['top_feature_1'].value_counts().to_dict())
+            for (label, feature), count in results_df.groupby(['prediction_label', 'top_feature_1']).size().items():
+                stats['label_top_feature_counts'].setdefault(label, Counter())[feature] += int(count)
+        
+        return stats
+    
     def generate_summary_report(self, results_df: pd.DataFrame) -> str:
         """
         Gera relatório resumido das predições em lote.
@@ -250,10 +894,23 @@ class ExoplanetPredictor:
         Returns:
             String com relatório formatado
         """
-        total = len(results_df)
+        return self.format_summary_report(self.summarize_results(results_df))
+    
+    @staticmethod
+    def format_summary_report(stats: Dict) -> str:
+        """
+        Formata o relatório a partir das estatísticas agregadas.
+        
+        Args:
+            stats: Dicionário retornado por summarize_results
+        
+        Returns:
+            String com relatório formatado
+        """
+        total = stats['total']
         
         # Contar por classe
-        counts = results_df['prediction_label'].value_counts()
+        counts = stats['label_counts'].most_common()
         
         report = "=" * 70 + "\n"
         report += "RELATÓRIO DE CLASSIFICAÇÃO EM LOTE\n"
@@ -263,31 +920,71 @@ class ExoplanetPredictor:
         report += f"Total de exoplanetas analisados: {total}\n\n"
         
         report += "📈 DISTRIBUIÇÃO POR CLASSE\n"
-        for label, count in counts.items():
+        for label, count in counts:
             percentage = (count / total) * 100
             report += f"  • {label}: {count} ({percentage:.1f}%)\n"
         
         report += f"\n🎯 CONFIANÇA MÉDIA\n"
-        avg_confidence = results_df['confidence'].mean() * 100
+        avg_confidence = stats['confidence_sum'] / total * 100
         report += f"  Confiança média: {avg_confidence:.1f}%\n"
         
         # Top features mais influentes
-        report += f"\n🔍 TOP 5 FEATURES MAIS INFLUENTES (geral)\n"
-        top_features = results_df['top_feature_1'].value_counts().head(5)
-        for i, (feature, count) in enumerate(top_features.items(), 1):
-            report += f"  {i}. {feature} (apareceu {count}x como mais importante)\n"
+        if stats['top_feature_counts']:
+            report += f"\n🔍 TOP 5 FEATURES MAIS INFLUENTES (geral)\n"
+            top_features = stats['top_feature_counts'].most_common(5)
+            for i, (feature, count) in enumerate(top_features, 1):
+                report += f"  {i}. {feature} (apareceu {count}x como mais importante)\n"
         
         # Estatísticas por classe
         report += f"\n📋 ESTATÍSTICAS POR CLASSE\n"
-        for label in counts.index:
+        for label, count in counts:
             if label != 'ERRO':
-                subset = results_df[results_df['prediction_label'] == label]
-                avg_conf = subset['confidence'].mean() * 100
+                avg_conf = stats['label_confidence_sum'][label] / count * 100
                 report += f"\n  {label}:\n"
                 report += f"    - Confiança média: {avg_conf:.1f}%\n"
-                report += f"    - Feature mais importante: {subset['top_feature_1'].mode().values[0]}\n"
+                feature_counts = stats['label_top_feature_counts'].get(label)
+                if feature_counts:
+                    # Moda (empate resolvido pelo menor nome, como em Series.mode)
+                    top_feature = min(feature_counts, key=lambda f: (-feature_counts[f], f))
+                    report += f"    - Feature mais importante: {top_feature}\n"
         
-        return report 
+        return report
+
+
+# ============================================================================
+# PROCESSOS DO MODO PARALELO
+# ============================================================================
+
+# Preditor carregado uma vez em cada processo do pool
+_worker_predictor = None
+
+
+def _init_worker(bundle_path: str, explainer_backend: str, cache_size: int, cache_path: Optional[str],
+                 inference_backend: str):
+    global _worker_predictor
+    # Cada processo mantém o próprio LRU; a camada em disco é compartilhada
+    _worker_predictor = ExoplanetPredictor(
+        bundle_path,
+        explainer_backend=explainer_backend,
+        cache_size=cache_size,
+        cache_path=cache_path,
+        inference_backend=inference_backend
+    )
+    # Um processo por núcleo: cada processo usa uma única thread no XGBoost
+    _worker_predictor.model.set_params(n_jobs=1)
+
+
+def _cache_counters(predictor: ExoplanetPredictor) -> Dict[str, int]:
+    stats = predictor.cache_stats()
+    return {key: stats[key] for key in CACHE_COUNTERS if key in stats}
+
+
+def _predict_shard(shard: pd.DataFrame, explanation: str, top_k: int):
+    # Resultados da fatia e o quanto os contadores de cache deste processo avançaram
+    before = _cache_counters(_worker_predictor)
+    results = _worker_predictor._predict_frame_local(shard, explanation, top_k)
+    after = _cache_counters(_worker_predictor)
+    return results, {key: after[key] - before[key] for key in after}
    
 
 
@@ -298,8 +995,7 @@ class ExoplanetPredictor:
 if __name__ == "__main__":
     # Inicializar preditor
     predictor = ExoplanetPredictor(
-        model_path="xgboost_grid_best_model.joblib",
-        training_data_path="./datasets/selected_features_exoplanets.csv"
+        bundle_path="./model_bundle"
     )
     
     # Exemplo 1: Usuário com todos os dados (exoplaneta confirmado típico)
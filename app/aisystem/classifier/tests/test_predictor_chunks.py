@@ -0,0 +1,78 @@
+"""
+Schema dos resultados em lote por blocos (predict_batch_chunks e
+predict_batch_streaming): blocos só com linhas inválidas, entradas sem linhas
+e arquivos que misturam os dois casos.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aisystem.classifier.predictor import ExoplanetPredictor
+
+BUNDLE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'model_bundle')
+
+
+@pytest.fixture(scope='module')
+def predictor():
+    return ExoplanetPredictor(BUNDLE_PATH)
+
+
+def write_csv(path, predictor, n_valid, n_invalid):
+    # Linhas válidas (medianas do treino) seguidas de linhas com valor infinito
+    rows = [dict(predictor.feature_medians) for _ in range(n_valid + n_invalid)]
+    for row in rows[n_valid:]:
+        row[predictor.feature_names[0]] = np.inf
+    pd.DataFrame(rows, columns=predictor.feature_names).to_csv(path, index=False)
+
+
+@pytest.mark.parametrize('explanation', ['none', 'topk', 'full'])
+def test_all_invalid_frame_has_result_schema(predictor, explanation):
+    df = pd.DataFrame([dict(predictor.feature_medians)] * 3)
+    df[predictor.feature_names[0]] = np.inf
+
+    results = predictor.predict_frame(df, explanation, top_k=3)
+
+    assert list(results.columns) == predictor.result_columns(explanation, 3)
+    assert (results['prediction_label'] == 'ERRO').all()
+
+
+def test_empty_frame_has_result_schema(predictor):
+    results = predictor.predict_frame(pd.DataFrame(columns=predictor.feature_names))
+
+    assert len(results) == 0
+    assert list(results.columns) == predictor.result_columns()
+
+
+def test_header_only_input_yields_nothing(predictor, tmp_path):
+    input_path = tmp_path / 'input.csv'
+    write_csv(input_path, predictor, 0, 0)
+
+    assert list(predictor.predict_batch_chunks(str(input_path), chunksize=10)) == []
+
+    for output_name in ('output.csv', 'output.parquet'):
+        stats = predictor.predict_batch_streaming(str(input_path), str(tmp_path / output_name), chunksize=10)
+        assert stats['total'] == 0
+        assert os.path.exists(tmp_path / output_name)
+
+
+@pytest.mark.parametrize('output_name', ['output.csv', 'output.parquet'])
+def test_mixed_valid_and_all_invalid_chunks(predictor, tmp_path, output_name):
+    # Primeiro bloco válido, segundo parcial, terceiro só com linhas inválidas
+    input_path = tmp_path / 'input.csv'
+    write_csv(input_path, predictor, 15, 10)
+
+    chunks = list(predictor.predict_batch_chunks(str(input_path), chunksize=10))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    assert all(list(chunk.columns) == list(chunks[0].columns) for chunk in chunks)
+
+    output_path = str(tmp_path / output_name)
+    stats = predictor.predict_batch_streaming(str(input_path), output_path, chunksize=10)
+    output = pd.read_csv(output_path) if output_name.endswith('.csv') else pd.read_parquet(output_path)
+
+    assert stats['total'] == 25 and stats['errors'] == 10
+    assert list(output.columns) == predictor.feature_names + predictor.result_columns()
+    assert (output['prediction_label'].iloc[15:] == 'ERRO').all()
+    assert output['prediction'].iloc[:15].notna().all()
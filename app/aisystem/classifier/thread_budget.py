@@ -0,0 +1,83 @@
+# thread_budget.py
+# Divide um orçamento de núcleos entre paralelismo externo (tarefas
+# simultâneas: folds, candidatos, n_jobs do scikit-learn) e interno (threads
+# do XGBoost, OpenMP e BLAS de cada tarefa), para que os scripts de treino
+# (gridsearch.py, gridsearchboost.py, decisiontree.py) não rodem N processos
+# com N threads cada em N núcleos.
+
+import math
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from joblib import parallel_config
+from threadpoolctl import threadpool_limits
+
+
+@dataclass
+class ThreadPlan:
+    """Layout escolhido: `outer` tarefas simultâneas com `inner` threads cada."""
+    budget: int
+    outer: int
+    inner: int
+
+    def describe(self) -> str:
+        return (f"{self.budget} núcleos → {self.outer} tarefa(s) em paralelo × "
+                f"{self.inner} thread(s) cada (XGBoost/OpenMP/BLAS)")
+
+
+def available_cpus() -> int:
+    """
+    Núcleos que este processo pode usar: afinidade de CPU e, em contêineres,
+    a cota do cgroup (cpu.max), que os.cpu_count() ignora.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def plan_threads(tasks: int, budget: Optional[int] = None, inner_parallel: bool = True) -> ThreadPlan:
+    """
+    Escolhe o layout para `tasks` tarefas independentes. Paralelismo externo
+    primeiro (escala quase linearmente; as threads do XGBoost em ~10 mil
+    linhas não), e os núcleos que sobram viram threads internas quando há
+    menos tarefas que núcleos (ex.: a última rodada do successive halving).
+
+    Args:
+        tasks: Número de tarefas independentes do lote
+        budget: Núcleos disponíveis (padrão: available_cpus())
+        inner_parallel: Se False (ex.: árvore de decisão), cada tarefa usa 1 thread
+
+    Returns:
+        ThreadPlan com outer * inner <= budget
+    """
+    budget = max(1, budget or available_cpus())
+    outer = max(1, min(budget, tasks))
+    inner = max(1, budget // outer) if inner_parallel else 1
+    return ThreadPlan(budget=budget, outer=outer, inner=inner)
+
+
+@contextmanager
+def thread_layout(plan: ThreadPlan) -> Iterator[ThreadPlan]:
+    """
+    Aplica o plano ao joblib (n_jobs padrão e threads OpenMP/BLAS dos
+    workers do scikit-learn) e às bibliotecas nativas deste processo.
+    """
+    # inner_max_num_threads só vale para o backend loky (o padrão do scikit-learn)
+    with parallel_config(backend='loky', n_jobs=plan.outer, inner_max_num_threads=plan.inner), \
+            threadpool_limits(plan.inner):
+        yield plan
+
+
+def log_plan(plan: ThreadPlan, label: str):
+    print(f"Layout de threads ({label}): {plan.describe()}")
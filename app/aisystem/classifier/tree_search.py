@@ -0,0 +1,131 @@
+# tree_search.py
+# Busca em grade da árvore de decisão por poda. max_depth e min_samples_split
+# só decidem onde o crescimento para: a árvore treinada com max_depth=d (ou
+# min_samples_split=s) é a árvore completa cortada nos nós de profundidade d
+# (ou com menos de s amostras). Então cada fold treina uma única árvore por
+# combinação dos parâmetros que mudam as divisões (criterion, class_weight,
+# min_samples_leaf, ...) e avalia todas as variantes de profundidade/divisão
+# percorrendo essa árvore e parando no nó onde a variante pararia.
+# min_samples_leaf não entra na poda: ele muda qual divisão é escolhida, não
+# só onde parar.
+# As notas não são idênticas às de um retreino: quando duas divisões empatam,
+# o scikit-learn sorteia a ordem das features em cada nó, e parar mais cedo
+# muda esse sorteio nos nós seguintes. Servem para ordenar a grade; as
+# melhores combinações devem ser retreinadas (gridsearch.py --rescore-top).
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from sklearn.metrics import f1_score
+from sklearn.model_selection import ParameterGrid
+from sklearn.tree import DecisionTreeClassifier
+
+try:
+    from .trial_store import task_key
+except ImportError:
+    from trial_store import task_key
+
+# Parâmetros avaliados por poda da árvore crescida
+PRUNE_PARAMS = ('max_depth', 'min_samples_split')
+
+
+def split_grid(param_grid: Dict) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Separa a grade em combinações que exigem treinar uma árvore e variantes
+    avaliadas por poda.
+
+    Returns:
+        (parâmetros de crescimento, variantes de poda)
+    """
+    growth = {key: values for key, values in param_grid.items() if key not in PRUNE_PARAMS}
+    prune = {key: values for key, values in param_grid.items() if key in PRUNE_PARAMS}
+    return list(ParameterGrid(growth)), list(ParameterGrid(prune))
+
+
+def _padded_paths(tree: DecisionTreeClassifier, X) -> np.ndarray:
+    # Nós do caminho raiz → folha de cada linha (ids crescem com a
+    # profundidade), completados com a folha até o maior comprimento
+    indicator = tree.decision_path(X)
+    indicator.sort_indices()
+    lengths = np.diff(indicator.indptr)
+    leaves = indicator.indices[indicator.indptr[1:] - 1]
+    paths = np.repeat(leaves[:, None], lengths.max(), axis=1)
+    paths[np.arange(lengths.max()) < lengths[:, None]] = indicator.indices
+    return paths
+
+
+def _node_depths(tree: DecisionTreeClassifier) -> np.ndarray:
+    structure = tree.tree_
+    depth = np.zeros(structure.node_count, dtype=int)
+    # Pais sempre têm id menor que os filhos
+    for node in range(structure.node_count):
+        for child in (structure.children_left[node], structure.children_right[node]):
+            if child != -1:
+                depth[child] = depth[node] + 1
+    return depth
+
+
+def pruned_predictions(tree: DecisionTreeClassifier, X, variants: Sequence[Dict]) -> List[np.ndarray]:
+    """
+    Predições de cada variante de poda (max_depth / min_samples_split) de uma
+    árvore treinada sem esses limites.
+
+    Args:
+        tree: Árvore treinada (com max_depth=None e min_samples_split=2)
+        X: Linhas a classificar
+        variants: Dicionários com max_depth e/ou min_samples_split
+
+    Returns:
+        Lista de arrays de classes preditas, uma por variante
+    """
+    structure = tree.tree_
+    paths = _padded_paths(tree, X)
+    depth = _node_depths(tree)
+    is_leaf = structure.children_left == -1
+    node_class = tree.classes_[structure.value[:, 0, :].argmax(axis=1)]
+    rows = np.arange(len(paths))
+
+    predictions = []
+    for variant in variants:
+        max_depth = variant.get('max_depth')
+        stop = is_leaf | (structure.n_node_samples < variant.get('min_samples_split', 2))
+        if max_depth is not None:
+            stop |= depth >= max_depth
+        first_stop = stop[paths].argmax(axis=1)
+        predictions.append(node_class[paths[rows, first_stop]])
+    return predictions
+
+
+def evaluate_group(X, y: np.ndarray, train_idx: np.ndarray, valid_idx: np.ndarray, growth_params: Dict,
+                   variants: Sequence[Dict], random_state: int = 0) -> List[Tuple[Dict, float]]:
+    """
+    Treina uma árvore no fold e mede f1_weighted de todas as variantes de poda.
+
+    Returns:
+        [(parâmetros completos, f1_weighted no fold de validação), ...]
+    """
+    params = {**growth_params, 'max_depth': None, 'min_samples_split': 2}
+    tree = DecisionTreeClassifier(random_state=random_state, **params)
+    tree.fit(X.iloc[train_idx], y[train_idx])
+    predictions = pruned_predictions(tree, X.iloc[valid_idx], variants)
+    return [
+        ({**growth_params, **variant}, float(f1_score(y[valid_idx], predicted, average='weighted')))
+        for variant, predicted in zip(variants, predictions)
+    ]
+
+
+def rank_candidates(candidates: Sequence[Dict], results: Sequence[List[Tuple[Dict, float]]]) -> List[Tuple[Dict, float]]:
+    """
+    Candidatos ordenados pela média dos folds, da maior para a menor. Empates
+    mantêm a ordem de `candidates` (a do ParameterGrid, como no GridSearchCV).
+
+    Returns:
+        [(parâmetros, f1_weighted médio), ...]
+    """
+    scores: Dict[str, List[float]] = {}
+    for result in results:
+        for params, score in result:
+            scores.setdefault(task_key(params), []).append(score)
+
+    means = [(params, float(np.mean(scores[task_key(params)]))) for params in candidates]
+    return sorted(means, key=lambda item: -item[1])
@@ -0,0 +1,279 @@
+# trial_store.py
+# Armazém de tentativas da busca de hiperparâmetros em SQLite (um arquivo
+# local ou num sistema de arquivos compartilhado, sem serviços externos).
+# Cada tarefa é a avaliação de uma configuração em um fold; a nota de cada
+# (parâmetros, fold) fica gravada. Vários processos (ou máquinas) rodando o
+# mesmo estudo dividem as tarefas pendentes entre si, e uma busca
+# interrompida retoma de onde parou, sem repetir as tarefas concluídas.
+#
+# Relatório (leaderboard):
+#   python trial_store.py report trials.db [--study NOME] [--top 20]
+
+import os
+import sys
+import json
+import time
+import socket
+import sqlite3
+import hashlib
+import argparse
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# (parâmetros completos, nota) de um fold
+Score = Tuple[Dict, float]
+
+# Máximo de parâmetros por consulta SQLite
+_SQLITE_BATCH = 500
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS studies ("
+    "name TEXT PRIMARY KEY, config TEXT NOT NULL, created REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS tasks ("
+    "study TEXT NOT NULL, key TEXT NOT NULL, payload TEXT NOT NULL, "
+    "status TEXT NOT NULL DEFAULT 'pending', worker TEXT, claimed REAL, finished REAL, result TEXT, "
+    "PRIMARY KEY (study, key))",
+    "CREATE INDEX IF NOT EXISTS tasks_status ON tasks (study, status)",
+    "CREATE TABLE IF NOT EXISTS scores ("
+    "study TEXT NOT NULL, task TEXT NOT NULL, params TEXT NOT NULL, "
+    "data_fraction REAL NOT NULL, fold INTEGER NOT NULL, score REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS scores_params ON scores (study, params, data_fraction)",
+)
+
+
+def _dumps(value) -> str:
+    # JSON canônico (chaves ordenadas); tipos do NumPy viram tipos Python
+    return json.dumps(value, sort_keys=True,
+                      default=lambda obj: obj.item() if isinstance(obj, np.generic) else str(obj))
+
+
+def task_key(task: Dict) -> str:
+    """Identificador estável de uma tarefa (hash do JSON canônico)."""
+    return hashlib.sha1(_dumps(task).encode()).hexdigest()
+
+
+class TrialStore:
+    """
+    Fila de tarefas e resultados de um estudo. Cada processo cria o seu
+    TrialStore apontando para o mesmo arquivo; run() enfileira as tarefas
+    (sem duplicar), executa as pendentes que conseguir reservar e espera as
+    reservadas pelos outros processos.
+    """
+
+    def __init__(self, path: str, study: str, config: Optional[Dict] = None,
+                 worker: Optional[str] = None, lease_seconds: float = 1800, poll_seconds: float = 2):
+        """
+        Args:
+            path: Arquivo SQLite (criado se não existir)
+            study: Nome do estudo (uma busca; vários estudos podem dividir o arquivo)
+            config: Configuração da busca (grade, folds, dados...); um estudo
+                existente com configuração diferente é recusado
+            worker: Nome deste processo (padrão: host-pid)
+            lease_seconds: Tarefas reservadas há mais tempo que isso sem
+                terminar (processo morto em outra máquina) voltam a ficar
+                disponíveis; as de processos mortos desta máquina voltam logo
+            poll_seconds: Intervalo de espera pelas tarefas dos outros processos
+        """
+        self.path = path
+        self.study = study
+        self.host = socket.gethostname()
+        self.worker = worker or f"{self.host}-{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.completed = 0
+
+        # isolation_level=None: transações explícitas (BEGIN IMMEDIATE) na reserva
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None)
+        for statement in _SCHEMA:
+            self._db.execute(statement)
+        if config is not None:
+            self._check_config(config)
+
+    def _check_config(self, config: Dict):
+        self._db.execute("INSERT OR IGNORE INTO studies (name, config, created) VALUES (?, ?, ?)",
+                         (self.study, _dumps(config), time.time()))
+        stored = self._db.execute("SELECT config FROM studies WHERE name = ?", (self.study,)).fetchone()[0]
+        if stored != _dumps(config):
+            raise ValueError(
+                f"O estudo '{self.study}' em {self.path} foi criado com outra configuração; "
+                f"use outro nome de estudo (--study) ou outro arquivo"
+            )
+
+    def _enqueue(self, tasks: Sequence[Dict], keys: Sequence[str]):
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO tasks (study, key, payload) VALUES (?, ?, ?)",
+                [(self.study, key, _dumps(task)) for key, task in zip(keys, tasks)]
+            )
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+
+    def _claim(self) -> Optional[Tuple[str, Dict]]:
+        # Reserva atômica da próxima tarefa pendente (ou abandonada) do estudo
+        now = time.time()
+        row = self._db.execute(
+            "UPDATE tasks SET status = 'running', worker = ?, claimed = ? "
+            "WHERE rowid = (SELECT rowid FROM tasks WHERE study = ? AND "
+            "(status = 'pending' OR (status = 'running' AND claimed < ?)) ORDER BY rowid LIMIT 1) "
+            "RETURNING key, payload",
+            (self.worker, now, self.study, now - self.lease_seconds)
+        ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def _finish(self, key: str, task: Dict, result: List[Score]):
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            # Outro processo pode ter concluído a mesma tarefa (reserva expirada)
+            updated = self._db.execute(
+                "UPDATE tasks SET status = 'done', finished = ?, result = ? "
+                "WHERE study = ? AND key = ? AND status != 'done'",
+                (time.time(), _dumps(result), self.study, key)
+            ).rowcount
+            if updated:
+                self._db.executemany(
+                    "INSERT INTO scores (study, task, params, data_fraction, fold, score) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(self.study, key, _dumps(params), task.get('data_fraction', 1.0), task.get('fold', 0), score)
+                     for params, score in result]
+                )
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self.completed += 1
+
+    def _release(self, key: str):
+        self._db.execute("UPDATE tasks SET status = 'pending', worker = NULL, claimed = NULL "
+                         "WHERE study = ? AND key = ? AND status = 'running' AND worker = ?",
+                         (self.study, key, self.worker))
+
+    def _recover_local(self):
+        # Tarefas reservadas por processos desta máquina que já não existem
+        # (ex.: busca morta com kill) voltam para a fila sem esperar o lease
+        running = self._db.execute(
+            "SELECT DISTINCT worker FROM tasks WHERE study = ? AND status = 'running' AND worker LIKE ?",
+            (self.study, f"{self.host}-%")
+        ).fetchall()
+        for (worker,) in running:
+            pid = worker[len(self.host) + 1:]
+            if not pid.isdigit() or int(pid) == os.getpid():
+                continue
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                self._db.execute("UPDATE tasks SET status = 'pending', worker = NULL, claimed = NULL "
+                                 "WHERE study = ? AND status = 'running' AND worker = ?", (self.study, worker))
+            except PermissionError:
+                pass
+
+    def _results(self, keys: Sequence[str]) -> Dict[str, List[Score]]:
+        results = {}
+        for start in range(0, len(keys), _SQLITE_BATCH):
+            chunk = keys[start:start + _SQLITE_BATCH]
+            placeholders = ','.join('?' * len(chunk))
+            for key, result in self._db.execute(
+                f"SELECT key, result FROM tasks WHERE study = ? AND status = 'done' AND key IN ({placeholders})",
+                (self.study, *chunk)
+            ):
+                results[key] = [(params, score) for params, score in json.loads(result)]
+        return results
+
+    def run(self, tasks: Sequence[Dict], evaluate_task: Callable[[Dict], List[Score]]) -> List[List[Score]]:
+        """
+        Executa um lote de tarefas com os outros processos do estudo.
+
+        Args:
+            tasks: Tarefas (dicionários JSON; use 'fold' e, se houver,
+                'data_fraction' para o relatório)
+            evaluate_task: Avalia uma tarefa e devolve [(parâmetros, nota), ...]
+
+        Returns:
+            Resultado de cada tarefa, na ordem recebida (inclui os calculados
+            por outros processos ou em execuções anteriores)
+        """
+        keys = [task_key(task) for task in tasks]
+        self._enqueue(tasks, keys)
+        while True:
+            claimed = self._claim()
+            if claimed is not None:
+                key, task = claimed
+                try:
+                    result = evaluate_task(task)
+                except BaseException:
+                    # Interrompido (ex.: Ctrl+C): a tarefa volta para a fila
+                    self._release(key)
+                    raise
+                self._finish(key, task, result)
+                continue
+
+            results = self._results(keys)
+            if len(results) == len(set(keys)):
+                return [results[key] for key in keys]
+            self._recover_local()
+            time.sleep(self.poll_seconds)
+
+    def close(self):
+        self._db.close()
+
+
+def mean_scores(results: Sequence[List[Score]]) -> List[Tuple[Dict, float]]:
+    """
+    Nota média (entre os folds) de cada conjunto de parâmetros, na ordem em
+    que aparecem nos resultados.
+    """
+    grouped: Dict[str, Tuple[Dict, List[float]]] = {}
+    for result in results:
+        for params, score in result:
+            grouped.setdefault(_dumps(params), (params, []))[1].append(score)
+    return [(params, float(np.mean(scores))) for params, scores in grouped.values()]
+
+
+def leaderboard(path: str, study: Optional[str] = None, top: int = 20):
+    """Imprime o progresso e as melhores configurações de cada estudo do arquivo."""
+    db = sqlite3.connect(path, timeout=60)
+    studies = [study] if study else [row[0] for row in db.execute("SELECT name FROM studies ORDER BY created")]
+    for name in studies:
+        counts = dict(db.execute("SELECT status, COUNT(*) FROM tasks WHERE study = ? GROUP BY status", (name,)))
+        workers = db.execute("SELECT COUNT(DISTINCT worker) FROM tasks WHERE study = ? AND worker IS NOT NULL",
+                             (name,)).fetchone()[0]
+        print("=" * 100)
+        print(f"ESTUDO: {name}")
+        print(f"Tarefas: {counts.get('done', 0)} concluídas, {counts.get('running', 0)} em execução, "
+              f"{counts.get('pending', 0)} pendentes ({workers} processos)")
+        print("=" * 100)
+
+        rows = db.execute(
+            "SELECT params, data_fraction, AVG(score), COUNT(*), "
+            "AVG(score * score) - AVG(score) * AVG(score) FROM scores WHERE study = ? "
+            "GROUP BY params, data_fraction ORDER BY data_fraction DESC, AVG(score) DESC LIMIT ?",
+            (name, top)
+        ).fetchall()
+        if not rows:
+            print("  (nenhuma nota registrada)\n")
+            continue
+        print(f"  {'#':>3} {'f1_weighted':>11} {'± desvio':>9} {'folds':>5} {'dados':>6}  parâmetros")
+        for rank, (params, data_fraction, mean, folds, variance) in enumerate(rows, 1):
+            print(f"  {rank:>3} {mean:>11.4f} {max(variance, 0) ** 0.5:>9.4f} {folds:>5} {data_fraction:>6.0%}  {params}")
+        print()
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Armazém de tentativas da busca de hiperparâmetros')
+    commands = parser.add_subparsers(dest='command', required=True)
+    report = commands.add_parser('report', help='Leaderboard dos estudos de um arquivo')
+    report.add_argument('store', help='Arquivo SQLite do armazém')
+    report.add_argument('--study', help='Só este estudo (padrão: todos)')
+    report.add_argument('--top', type=int, default=20, help='Configurações exibidas por estudo')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.store):
+        sys.exit(f"Arquivo não encontrado: {args.store}")
+    leaderboard(args.store, args.study, args.top)
+
+
+if __name__ == "__main__":
+    main()
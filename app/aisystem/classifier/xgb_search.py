@@ -0,0 +1,499 @@
+# xgb_search.py
+# Busca adaptativa de hiperparâmetros do XGBoost (successive halving e
+# Hyperband). Em vez de treinar toda combinação da grade com o orçamento
+# completo, cada rodada ("rung") avalia os candidatos com uma fração do
+# orçamento (rodadas de boosting e/ou fração dos dados de treino de cada
+# fold) e só o melhor 1/eta segue para a rodada seguinte, com orçamento eta
+# vezes maior. Os folds estratificados e a métrica (f1_weighted, média dos
+# folds) são os mesmos do GridSearchCV.
+# n_estimators nunca é um eixo da busca: cada configuração é treinada uma vez
+# por fold com o maior número de árvores e os valores menores são avaliados
+# nos prefixos do mesmo modelo (predict com iteration_range), que são
+# idênticos a modelos treinados do zero com menos árvores.
+# A quantização do tree_method='hist' (os cortes dos histogramas) é feita uma
+# única vez, com todas as linhas; as matrizes de treino de cada fold (e de
+# cada fração dele) reutilizam esses cortes (QuantileDMatrix com ref=) e,
+# junto com as de validação, ficam em cache para todos os candidatos.
+# Com um TrialStore (trial_store.py), cada (configuração, fold) vira uma
+# tarefa gravada em SQLite: a busca retoma de onde parou e vários processos
+# (ou máquinas) com o mesmo estudo dividem as tarefas de cada rodada.
+# Os núcleos são divididos entre folds/candidatos simultâneos (threads; o
+# XGBoost libera o GIL e as matrizes em cache são compartilhadas) e threads
+# de cada treino, conforme thread_budget.plan_threads.
+
+import math
+import time
+import threading
+import numpy as np
+import xgboost as xgb
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from sklearn.metrics import f1_score
+from sklearn.model_selection import ParameterGrid, ParameterSampler
+
+try:
+    from .trial_store import TrialStore
+    from .thread_budget import ThreadPlan, available_cpus, plan_threads
+except ImportError:
+    from trial_store import TrialStore
+    from thread_budget import ThreadPlan, available_cpus, plan_threads
+
+# Recursos que podem ser reduzidos nas primeiras rodadas
+RESOURCES = ('rounds', 'data', 'both')
+
+# evaluate_many(candidatos, rounds, data_fraction) -> [{árvores: f1_weighted médio}, ...]
+EvaluateMany = Callable[[Sequence[Dict], Sequence[int], float], List[Dict[int, float]]]
+
+
+@dataclass
+class Rung:
+    """Orçamento de uma rodada: número de árvores e fração dos dados de treino."""
+    rounds: int
+    data_fraction: float
+
+
+@dataclass
+class Trial:
+    params: Dict
+    rounds: int
+    data_fraction: float
+    score: float
+    bracket: int = 0
+    rung: int = 0
+
+
+@dataclass
+class SearchResult:
+    best_params: Dict
+    best_score: float
+    trials: List[Trial] = field(default_factory=list)
+    n_candidates: int = 0
+    seconds: float = 0.0
+
+
+def stratified_prefix(train_idx: np.ndarray, y: np.ndarray, fraction: float, seed: int) -> np.ndarray:
+    """
+    Subconjunto estratificado de `fraction` das linhas de treino de um fold.
+    A permutação depende só da semente, então frações maiores contêm as
+    menores (os subconjuntos são aninhados).
+    """
+    if fraction >= 1:
+        return train_idx
+    rng = np.random.default_rng(seed)
+    labels = y[train_idx]
+    parts = []
+    for cls in np.unique(labels):
+        members = rng.permutation(train_idx[labels == cls])
+        parts.append(members[:max(1, int(round(fraction * len(members))))])
+    return np.sort(np.concatenate(parts))
+
+
+class FoldEvaluator:
+    """
+    Avalia uma configuração com validação cruzada: treina em (uma fração
+    d)o treino de cada fold e mede f1_weighted no fold de validação inteiro.
+    As matrizes quantizadas e os índices de cada fold são montados uma vez e
+    reutilizados por todos os candidatos.
+    """
+
+    def __init__(self, X, y: np.ndarray, folds: Sequence[Tuple[np.ndarray, np.ndarray]],
+                 base_params: Dict, seed: int = 0, early_stopping_rounds: Optional[int] = None,
+                 store: Optional[TrialStore] = None, cpus: Optional[int] = None):
+        """
+        Args:
+            X: Features (DataFrame ou matriz)
+            y: Rótulos (inteiros 0..K-1)
+            folds: Pares (índices de treino, índices de validação), ex.: list(skf.split(X, y))
+            base_params: Parâmetros fixos do XGBClassifier (random_state, tree_method, ...)
+            seed: Semente dos subconjuntos de treino
+            early_stopping_rounds: Se definido, para o treino de cada fold quando
+                o mlogloss do fold de validação não melhora por esse número de
+                árvores; cada prefixo é avaliado com no máximo as árvores até a
+                melhor iteração
+            store: Armazém de tentativas; se definido, evaluate_many() grava e
+                reaproveita as notas de cada fold e divide as tarefas com
+                outros processos
+            cpus: Núcleos que a avaliação pode usar (padrão: todos os
+                disponíveis). Com um armazém, cada processo treina uma tarefa
+                por vez com todos eles; para mais paralelismo, rode mais
+                processos com menos núcleos cada
+        """
+        self.X = np.asarray(X, dtype=np.float32)
+        self.y = np.asarray(y)
+        self.folds = list(folds)
+        self.base_params = base_params
+        self.seed = seed
+        self.early_stopping_rounds = early_stopping_rounds
+        self.store = store
+        self.cpus = cpus or available_cpus()
+        self.n_classes = len(np.unique(self.y))
+        self.fits = 0
+        self._fits_lock = threading.Lock()
+
+        # Cortes dos histogramas calculados uma vez, com todas as linhas
+        self.max_bin = base_params.get('max_bin') or 256
+        self.full_matrix = xgb.QuantileDMatrix(self.X, self.y, max_bin=self.max_bin)
+        self._train_matrices: Dict[Tuple[int, float], xgb.QuantileDMatrix] = {}
+        self._valid_matrices: Dict[int, xgb.DMatrix] = {}
+
+    def train_matrix(self, fold: int, data_fraction: float = 1.0) -> xgb.QuantileDMatrix:
+        """Matriz de treino (em cache) do fold, com `data_fraction` das linhas."""
+        key = (fold, data_fraction)
+        if key not in self._train_matrices:
+            train_idx = self.folds[fold][0]
+            rows = stratified_prefix(train_idx, self.y, data_fraction, self.seed + fold)
+            # Subconjunto quantizado com os cortes da matriz completa (sem novo sketch)
+            self._train_matrices[key] = xgb.QuantileDMatrix(
+                self.X[rows], self.y[rows], ref=self.full_matrix, max_bin=self.max_bin
+            )
+        return self._train_matrices[key]
+
+    def valid_matrix(self, fold: int) -> xgb.DMatrix:
+        """
+        Matriz de validação (em cache) do fold. Só é usada para predição e
+        early stopping, que não precisam de quantização.
+        """
+        if fold not in self._valid_matrices:
+            valid_idx = self.folds[fold][1]
+            self._valid_matrices[fold] = xgb.DMatrix(self.X[valid_idx], self.y[valid_idx])
+        return self._valid_matrices[fold]
+
+    def booster_params(self, params: Dict) -> Dict:
+        """Parâmetros do xgb.train equivalentes a XGBClassifier(**base_params, **params)."""
+        booster_params = xgb.XGBClassifier(**{**self.base_params, **params}).get_xgb_params()
+        if self.n_classes > 2:
+            booster_params.update(objective='multi:softprob', num_class=self.n_classes)
+        else:
+            booster_params.update(objective='binary:logistic')
+        return booster_params
+
+    def _train(self, params: Dict, rounds: int, fold: int, data_fraction: float = 1.0,
+               early_stopping: bool = True, threads: Optional[int] = None) -> xgb.Booster:
+        stop = self.early_stopping_rounds if early_stopping else None
+        booster = xgb.train(
+            {**self.booster_params(params), 'n_jobs': threads or self.cpus},
+            self.train_matrix(fold, data_fraction),
+            num_boost_round=rounds,
+            evals=[(self.valid_matrix(fold), 'validation')] if stop else (),
+            early_stopping_rounds=stop,
+            verbose_eval=False,
+        )
+        with self._fits_lock:
+            self.fits += 1
+        return booster
+
+    def _predict(self, booster: xgb.Booster, fold: int, rounds: int) -> np.ndarray:
+        proba = booster.predict(self.valid_matrix(fold), iteration_range=(0, rounds))
+        return proba.argmax(axis=1) if proba.ndim == 2 else (proba > 0.5).astype(int)
+
+    def _parallel_map(self, func: Callable, items: Sequence, plan: ThreadPlan) -> List:
+        # Threads: o XGBoost libera o GIL durante o treino e a predição
+        if plan.outer == 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=plan.outer, thread_name_prefix='fold') as pool:
+            return list(pool.map(func, items))
+
+    def _prepare(self, data_fraction: float):
+        # Monta as matrizes em cache antes de dividir as tarefas entre threads
+        for fold in range(len(self.folds)):
+            self.train_matrix(fold, data_fraction)
+            self.valid_matrix(fold)
+
+    def evaluate_fold(self, params: Dict, rounds: Sequence[int], fold: int,
+                      data_fraction: float = 1.0, threads: Optional[int] = None) -> Dict[int, float]:
+        """f1_weighted de um fold para cada número de árvores em `rounds` (um único treino)."""
+        valid_idx = self.folds[fold][1]
+        booster = self._train(params, max(rounds), fold, data_fraction, threads=threads)
+        trained = booster.best_iteration + 1 if self.early_stopping_rounds else max(rounds)
+
+        scores, predictions = {}, {}
+        for n in rounds:
+            used = min(n, trained)
+            if used not in predictions:
+                predictions[used] = self._predict(booster, fold, used)
+            scores[n] = float(f1_score(self.y[valid_idx], predictions[used], average='weighted'))
+        return scores
+
+    def evaluate_prefixes(self, params: Dict, rounds: Sequence[int], data_fraction: float = 1.0) -> Dict[int, float]:
+        """
+        f1_weighted médio nos folds para cada número de árvores em `rounds`,
+        com um único treino por fold (com o maior deles).
+
+        Args:
+            params: Hiperparâmetros da configuração (sem n_estimators)
+            rounds: Números de árvores avaliados
+            data_fraction: Fração do treino de cada fold usada
+
+        Returns:
+            Dicionário {árvores: f1_weighted médio}
+        """
+        return self.evaluate_many([params], rounds, data_fraction, verbose=False)[0]
+
+    def evaluate(self, params: Dict, rounds: int, data_fraction: float = 1.0) -> float:
+        """f1_weighted médio nos folds com `rounds` árvores treinadas em `data_fraction` do treino."""
+        return self.evaluate_prefixes(params, [rounds], data_fraction)[rounds]
+
+    def _evaluate_task(self, task: Dict) -> List[Tuple[Dict, float]]:
+        scores = self.evaluate_fold(task['params'], task['rounds'], task['fold'], task['data_fraction'])
+        return [({**task['params'], 'n_estimators': n}, score) for n, score in scores.items()]
+
+    def evaluate_many(self, candidates: Sequence[Dict], rounds: Sequence[int],
+                      data_fraction: float = 1.0, verbose: bool = True) -> List[Dict[int, float]]:
+        """
+        evaluate_prefixes() de vários candidatos. Com um TrialStore, as
+        tarefas (candidato, fold) são gravadas e divididas com os outros
+        processos do estudo; as já concluídas não são refeitas.
+
+        Returns:
+            {árvores: f1_weighted médio} de cada candidato, na mesma ordem
+        """
+        rounds = sorted(rounds)
+        n_folds = len(self.folds)
+        tasks = [
+            {'params': params, 'rounds': rounds, 'data_fraction': data_fraction, 'fold': fold}
+            for params in candidates for fold in range(n_folds)
+        ]
+
+        if self.store is None:
+            plan = plan_threads(len(tasks), self.cpus)
+            self._prepare(data_fraction)
+            fold_scores = self._parallel_map(
+                lambda task: self.evaluate_fold(task['params'], rounds, task['fold'], data_fraction,
+                                                threads=plan.inner),
+                tasks, plan
+            )
+            if verbose:
+                print(f"    {len(tasks)} tarefas: {plan.describe()}")
+        else:
+            completed = self.store.completed
+            task_results = self.store.run(tasks, self._evaluate_task)
+            fold_scores = [
+                {full_params['n_estimators']: score for full_params, score in result}
+                for result in task_results
+            ]
+            if verbose:
+                print(f"    {len(tasks)} tarefas, {self.store.completed - completed} executadas por este processo")
+
+        results = []
+        for i, params in enumerate(candidates):
+            folds = fold_scores[i * n_folds:(i + 1) * n_folds]
+            results.append({n: float(np.mean([scores[n] for scores in folds])) for n in rounds})
+            if verbose and self.store is None:
+                print(f"    [{i + 1}/{len(candidates)}] {params}: {max(results[-1].values()):.4f}")
+        return results
+
+    def cross_val_predict(self, params: Dict) -> np.ndarray:
+        """
+        Predições fora do fold de cada linha (como sklearn.cross_val_predict),
+        com as matrizes em cache e sem early stopping.
+
+        Args:
+            params: Hiperparâmetros completos, incluindo n_estimators
+        """
+        params = dict(params)
+        rounds = params.pop('n_estimators', 100)
+        plan = plan_threads(len(self.folds), self.cpus)
+        self._prepare(1.0)
+
+        def predict_fold(fold):
+            booster = self._train(params, rounds, fold, early_stopping=False, threads=plan.inner)
+            return self._predict(booster, fold, rounds)
+
+        y_pred = np.empty_like(self.y)
+        for fold, predictions in enumerate(self._parallel_map(predict_fold, range(len(self.folds)), plan)):
+            y_pred[self.folds[fold][1]] = predictions
+        return y_pred
+
+
+def rung_schedule(max_rounds: int, min_rounds: int, eta: int, resource: str,
+                  min_data_fraction: float = 0.1) -> List[Rung]:
+    """
+    Orçamentos das rodadas, do menor ao completo: a rodada i usa eta^(i - última)
+    do orçamento em árvores ('rounds'), em dados ('data') ou em ambos ('both').
+
+    Args:
+        max_rounds: Árvores na última rodada (maior n_estimators da grade)
+        min_rounds: Mínimo de árvores na primeira rodada
+        eta: Fator de redução (só 1/eta dos candidatos segue adiante)
+        resource: 'rounds', 'data' ou 'both'
+        min_data_fraction: Menor fração dos dados de treino
+    """
+    if resource not in RESOURCES:
+        raise ValueError(f"Recurso inválido: {resource} (use {', '.join(RESOURCES)})")
+    if resource == 'data':
+        span = 1 / min_data_fraction
+    else:
+        span = max_rounds / max(1, min_rounds)
+    n_rungs = int(math.floor(math.log(max(span, 1), eta) + 1e-9)) + 1
+
+    rungs = []
+    for i in range(n_rungs):
+        budget = eta ** (i - (n_rungs - 1))
+        rounds = max_rounds if resource == 'data' else max(1, int(round(max_rounds * budget)))
+        fraction = 1.0 if resource == 'rounds' else max(min_data_fraction, budget)
+        rungs.append(Rung(rounds=rounds, data_fraction=fraction))
+    return rungs
+
+
+def successive_halving(candidates: List[Dict], rungs: List[Rung], eta: int,
+                       evaluate_many: EvaluateMany, bracket: int = 0, verbose: bool = True) -> List[Trial]:
+    """
+    Avalia todos os candidatos na primeira rodada e mantém o melhor 1/eta
+    (pelo menos um) para cada rodada seguinte.
+
+    Returns:
+        Todas as avaliações feitas; as da última rodada usam o orçamento completo
+    """
+    trials = []
+    survivors = list(candidates)
+    for i, rung in enumerate(rungs):
+        if verbose:
+            print(f"  [bracket {bracket}] rodada {i + 1}/{len(rungs)}: {len(survivors)} candidatos, "
+                  f"{rung.rounds} árvores, {rung.data_fraction:.0%} dos dados")
+        scores = evaluate_many(survivors, [rung.rounds], rung.data_fraction)
+        scored = [
+            Trial(params=params, rounds=rung.rounds, data_fraction=rung.data_fraction,
+                  score=candidate_scores[rung.rounds], bracket=bracket, rung=i)
+            for params, candidate_scores in zip(survivors, scores)
+        ]
+        trials += scored
+        if i < len(rungs) - 1:
+            scored.sort(key=lambda trial: trial.score, reverse=True)
+            survivors = [trial.params for trial in scored[:max(1, len(scored) // eta)]]
+    return trials
+
+
+def _best_full_budget(trials: List[Trial], rungs: List[Rung]) -> Trial:
+    # Só avaliações com o orçamento completo são comparáveis entre si
+    final = [trial for trial in trials
+             if trial.rounds == rungs[-1].rounds and trial.data_fraction == rungs[-1].data_fraction]
+    return max(final, key=lambda trial: trial.score)
+
+
+def _search_space(param_grid: Dict) -> Dict:
+    # n_estimators vira o orçamento; o restante da grade são os candidatos
+    return {key: values for key, values in param_grid.items() if key != 'n_estimators'}
+
+
+def run_grid_search(param_grid: Dict, evaluate_many: EvaluateMany) -> SearchResult:
+    """
+    Busca exaustiva na grade, como o GridSearchCV, mas com um treino por
+    configuração e fold: todos os valores de n_estimators saem dos prefixos
+    do modelo com o maior deles.
+
+    Args:
+        param_grid: Grade no formato do GridSearchCV
+        evaluate_many: Como em run_successive_halving; recebe todos os
+            valores de n_estimators de uma vez
+
+    Returns:
+        SearchResult com os melhores parâmetros (incluindo n_estimators)
+    """
+    start = time.perf_counter()
+    rounds = sorted(param_grid.get('n_estimators', [100]))
+    candidates = list(ParameterGrid(_search_space(param_grid)))
+
+    trials = [
+        Trial(params=params, rounds=n, data_fraction=1.0, score=score)
+        for params, scores in zip(candidates, evaluate_many(candidates, rounds, 1.0))
+        for n, score in scores.items()
+    ]
+
+    # Em caso de empate fica o primeiro, ou seja, o menor n_estimators
+    best = max(trials, key=lambda trial: trial.score)
+    return SearchResult(
+        best_params={**best.params, 'n_estimators': best.rounds},
+        best_score=best.score,
+        trials=trials,
+        n_candidates=len(candidates),
+        seconds=time.perf_counter() - start,
+    )
+
+
+def run_successive_halving(param_grid: Dict, evaluate_many: EvaluateMany,
+                           eta: int = 3, min_rounds: int = 10, resource: str = 'both',
+                           min_data_fraction: float = 0.1, n_candidates: Optional[int] = None,
+                           random_state: int = 0) -> SearchResult:
+    """
+    Successive halving sobre a grade (ou uma amostra dela).
+
+    Args:
+        param_grid: Grade no formato do GridSearchCV; o maior n_estimators
+            é o orçamento da última rodada
+        evaluate_many: evaluate_many(candidatos, rounds, data_fraction) ->
+            [{árvores: f1_weighted médio}, ...], ex.: FoldEvaluator.evaluate_many
+        eta: Fator de redução
+        min_rounds: Árvores na primeira rodada
+        resource: Recurso reduzido nas primeiras rodadas ('rounds', 'data', 'both')
+        min_data_fraction: Menor fração dos dados de treino
+        n_candidates: Candidatos sorteados da grade (None = a grade inteira)
+        random_state: Semente do sorteio
+
+    Returns:
+        SearchResult com os melhores parâmetros (incluindo n_estimators)
+    """
+    start = time.perf_counter()
+    max_rounds = max(param_grid.get('n_estimators', [100]))
+    rungs = rung_schedule(max_rounds, min_rounds, eta, resource, min_data_fraction)
+
+    space = _search_space(param_grid)
+    grid_size = len(ParameterGrid(space))
+    if n_candidates is None or n_candidates >= grid_size:
+        candidates = list(ParameterGrid(space))
+    else:
+        candidates = list(ParameterSampler(space, n_candidates, random_state=random_state))
+
+    trials = successive_halving(candidates, rungs, eta, evaluate_many)
+    best = _best_full_budget(trials, rungs)
+    return SearchResult(
+        best_params={**best.params, 'n_estimators': best.rounds},
+        best_score=best.score,
+        trials=trials,
+        n_candidates=len(candidates),
+        seconds=time.perf_counter() - start,
+    )
+
+
+def run_hyperband(param_grid: Dict, evaluate_many: EvaluateMany,
+                  eta: int = 3, min_rounds: int = 10, resource: str = 'both',
+                  min_data_fraction: float = 0.1, random_state: int = 0) -> SearchResult:
+    """
+    Hyperband: várias execuções de successive halving ("brackets"), da mais
+    agressiva (muitos candidatos, orçamento inicial mínimo) à mais
+    conservadora (poucos candidatos, orçamento completo desde o início).
+    Cada bracket sorteia seus candidatos da grade, então grades enormes
+    (ex.: param_grid_full) não precisam ser enumeradas.
+
+    Args:
+        param_grid, evaluate_many, eta, min_rounds, resource, min_data_fraction,
+        random_state: Como em run_successive_halving
+
+    Returns:
+        SearchResult com o melhor resultado entre os brackets
+    """
+    start = time.perf_counter()
+    max_rounds = max(param_grid.get('n_estimators', [100]))
+    rungs = rung_schedule(max_rounds, min_rounds, eta, resource, min_data_fraction)
+    s_max = len(rungs) - 1
+
+    space = _search_space(param_grid)
+    grid_size = len(ParameterGrid(space))
+    trials = []
+    n_candidates = 0
+    for s in range(s_max, -1, -1):
+        n = int(math.ceil((s_max + 1) / (s + 1) * eta ** s))
+        n = min(n, grid_size)
+        candidates = list(ParameterSampler(space, n, random_state=random_state + s))
+        n_candidates += len(candidates)
+        # O bracket s começa s rodadas antes do orçamento completo
+        trials += successive_halving(candidates, rungs[s_max - s:], eta, evaluate_many, bracket=s_max - s)
+
+    best = _best_full_budget(trials, rungs)
+    return SearchResult(
+        best_params={**best.params, 'n_estimators': best.rounds},
+        best_score=best.score,
+        trials=trials,
+        n_candidates=n_candidates,
+        seconds=time.perf_counter() - start,
+    )
@@ -0,0 +1,161 @@
+"""
+Micro-batching for single predictions.
+
+Concurrent /api/predict/ requests are queued, and one dispatcher thread runs
+whatever arrived within a short window (or up to a maximum batch size) as a
+single predict_records call. The fixed cost of a model/SHAP call is then
+shared by the whole batch instead of being paid once per request.
+"""
+
+import queue
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+
+# Upper bounds of the histogram buckets (a final +Inf bucket is implied)
+HISTOGRAM_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class Histogram:
+    """Fixed-bucket histogram; each observation lands in the first bucket >= value."""
+
+    def __init__(self, buckets=HISTOGRAM_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        labels = [str(bound) for bound in self.buckets] + ['+Inf']
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": self.count,
+            "sum": self.sum,
+        }
+
+
+@dataclass
+class PredictRequest:
+    records: List[Dict]
+    explanation: str
+    top_k: int
+    future: Future = field(default_factory=Future)
+
+
+class MicroBatchDispatcher:
+    """
+    Coalesces concurrent predict calls into batched predictor.predict_records
+    calls. A batch closes `window_ms` after its first request arrives, or as
+    soon as it holds `max_batch_size` records. Requests are never split, and
+    requests with different explanation settings are scored separately.
+    With window_ms=0 nothing waits: only requests that queued up while the
+    previous batch was running are coalesced.
+    """
+
+    def __init__(self, predictor, max_batch_size=64, window_ms=2.0):
+        self.predictor = predictor
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.window_ms = max(0.0, float(window_ms))
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._batches = 0
+        self._queue_depths = Histogram()
+        self._batch_sizes = Histogram()
+
+    def predict(self, records, explanation='topk', top_k=10):
+        """Queue the records and block until their results are ready."""
+        if not records:
+            return []
+        self._ensure_started()
+
+        request = PredictRequest(records=list(records), explanation=explanation, top_k=top_k)
+        self._queue.put(request)
+        with self._stats_lock:
+            self._requests += 1
+            self._queue_depths.observe(self._queue.qsize())
+        return request.future.result()
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "window_ms": self.window_ms,
+                "max_batch_size": self.max_batch_size,
+                "queue_depth": self._queue.qsize(),
+                "requests": self._requests,
+                "batches": self._batches,
+                "queue_depth_histogram": self._queue_depths.snapshot(),
+                "batch_size_histogram": self._batch_sizes.snapshot(),
+            }
+
+    def _ensure_started(self):
+        # Started on first use, so importing the views (manage.py commands,
+        # pre-fork servers) does not spawn a thread
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='predict-dispatcher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0].records)
+            deadline = time.monotonic() + self.window_ms / 1000
+
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request.records)
+
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        groups = {}
+        for request in batch:
+            groups.setdefault((request.explanation, request.top_k), []).append(request)
+
+        for (explanation, top_k), requests in groups.items():
+            records = [record for request in requests for record in request.records]
+            with self._stats_lock:
+                self._batches += 1
+                self._batch_sizes.observe(len(records))
+
+            try:
+                results = self.predictor.predict_records(records, explanation=explanation, top_k=top_k)
+            except Exception as e:
+                if len(requests) == 1:
+                    requests[0].future.set_exception(e)
+                else:
+                    # One bad request must not fail its neighbours: retry each alone
+                    for request in requests:
+                        self._dispatch_single(request)
+                continue
+
+            start = 0
+            for request in requests:
+                request.future.set_result(results[start:start + len(request.records)])
+                start += len(request.records)
+
+    def _dispatch_single(self, request):
+        try:
+            request.future.set_result(
+                self.predictor.predict_records(request.records, explanation=request.explanation,
+                                               top_k=request.top_k)
+            )
+        except Exception as e:
+            request.future.set_exception(e)
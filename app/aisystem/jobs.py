@@ -0,0 +1,228 @@
+"""
+Background batch classification jobs.
+
+Uploads are stored in a job directory and classified by a local worker pool,
+so the HTTP request that submits the file returns immediately. Clients poll
+the job status for progress and download the finished results file.
+
+Job state is kept next to the files, one JSON file per job in the job
+directory, so with several server processes (gunicorn workers) any of them
+can answer status and download requests for a job another one is running.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+
+# Result formats a job can produce, keyed by the extension of the output file
+RESULT_FORMATS = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.file',
+}
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Job ids are uuid4 hex strings; anything else never names a file in the job directory
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+@dataclass
+class BatchJob:
+    job_id: str
+    input_path: str
+    result_format: str
+    explanation: str = 'topk'
+    top_k: int = 3
+    status: str = QUEUED
+    rows_done: int = 0
+    rows_total: Optional[int] = None
+    stats: Optional[Dict] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    # Process running the job, to spot jobs orphaned by a worker that died
+    pid: int = field(default_factory=os.getpid)
+
+    @property
+    def result_filename(self):
+        return f"{self.job_id}.{self.result_format}"
+
+
+class JobManager:
+    """
+    Runs predict_batch jobs on a thread pool. Job state and result files live
+    in `job_dir`, shared by every process using the same directory; finished
+    jobs older than `ttl_seconds` are removed (files included) the next time
+    the manager is used.
+    """
+
+    def __init__(self, predictor, job_dir, max_workers=2, ttl_seconds=3600, chunksize=50_000):
+        self.predictor = predictor
+        self.job_dir = str(job_dir)
+        self.ttl_seconds = ttl_seconds
+        self.chunksize = chunksize
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='classify-job')
+        os.makedirs(self.job_dir, exist_ok=True)
+
+    def submit(self, uploaded_file, result_format='csv', explanation='topk', top_k=3):
+        """Store the upload and queue it for classification. Returns the job."""
+        if result_format not in RESULT_FORMATS:
+            raise ValueError(f"Unsupported result format: {result_format}")
+
+        self.cleanup_expired()
+
+        job_id = uuid.uuid4().hex
+        suffix = os.path.splitext(uploaded_file.name.lower())[1]
+        input_path = os.path.join(self.job_dir, f"{job_id}_input{suffix}")
+        with open(input_path, 'wb') as f:
+            for chunk in uploaded_file.chunks():
+                f.write(chunk)
+
+        job = BatchJob(job_id=job_id, input_path=input_path, result_format=result_format,
+                       explanation=explanation, top_k=top_k)
+        self._save(job)
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        self.cleanup_expired()
+        if not JOB_ID_PATTERN.match(job_id):
+            return None
+        job = self._load(self._state_path(job_id))
+        if job is not None and job.status in (QUEUED, RUNNING) and not _process_alive(job.pid):
+            # The worker that owned the job exited (restart, crash) mid-run. PIDs
+            # are only meaningful because the job directory is local to one host
+            job.status = FAILED
+            job.error = 'The server process running this job exited; submit the file again'
+            job.finished_at = time.time()
+            self._save(job)
+        return job
+
+    def status_counts(self):
+        """Number of known jobs per status (across all processes sharing the job directory)."""
+        counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}
+        for job in self._all_jobs():
+            counts[job.status] += 1
+        return counts
+
+    def get_by_filename(self, filename):
+        """Look up a finished job by its result file name."""
+        job = self.get(filename.split('.', 1)[0])
+        if job is None or job.status != DONE or job.result_filename != filename:
+            return None
+        return job
+
+    def result_path(self, job):
+        return os.path.join(self.job_dir, job.result_filename)
+
+    def _state_path(self, job_id):
+        return os.path.join(self.job_dir, f"{job_id}.json")
+
+    def _save(self, job):
+        # Write-then-rename, so readers in other processes never see a partial file
+        path = self._state_path(job.job_id)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(vars(job), f, default=lambda obj: obj.item() if hasattr(obj, 'item') else str(obj))
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _load(path):
+        try:
+            with open(path) as f:
+                return BatchJob(**json.load(f))
+        except (FileNotFoundError, ValueError, TypeError):
+            return None
+
+    def _all_jobs(self):
+        for name in os.listdir(self.job_dir):
+            if name.endswith('.json') and JOB_ID_PATTERN.match(name[:-len('.json')]):
+                job = self._load(os.path.join(self.job_dir, name))
+                if job is not None:
+                    yield job
+
+    def _set_progress(self, job, rows):
+        job.rows_done = rows
+        self._save(job)
+
+    def _run(self, job):
+        job.status = RUNNING
+        self._save(job)
+        output_path = self.result_path(job)
+        try:
+            job.rows_total = self.predictor.count_input_rows(job.input_path)
+            self._save(job)
+
+            if job.result_format == 'xlsx':
+                import pandas as pd
+
+                # Excel files cannot be appended to, so collect the chunks first
+                chunks = []
+                for results_chunk in self.predictor.predict_batch_chunks(
+                        job.input_path, self.chunksize, job.explanation, job.top_k):
+                    chunks.append(results_chunk)
+                    job.stats = self.predictor.summarize_results(results_chunk, job.stats)
+                    self._set_progress(job, job.stats['total'])
+                if not chunks:
+                    # Input without rows: no chunks, an empty workbook and zeroed stats
+                    job.stats = self.predictor.summarize_results(pd.DataFrame(columns=['prediction_label', 'confidence']))
+                results_df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+                results_df.to_excel(output_path, index=False)
+            else:
+                job.stats = self.predictor.predict_batch_streaming(
+                    job.input_path,
+                    output_path,
+                    chunksize=self.chunksize,
+                    progress_callback=lambda rows: self._set_progress(job, rows),
+                    explanation=job.explanation,
+                    top_k=job.top_k
+                )
+
+            job.rows_done = job.stats['total']
+            job.rows_total = job.stats['total']
+            job.status = DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+            self._remove_file(output_path)
+        finally:
+            job.finished_at = time.time()
+            self._save(job)
+            self._remove_file(job.input_path)
+
+    def cleanup_expired(self):
+        """Drop finished jobs (and their files) older than the TTL."""
+        cutoff = time.time() - self.ttl_seconds
+        for job in self._all_jobs():
+            if job.finished_at is not None and job.finished_at < cutoff:
+                self._remove_file(self._state_path(job.job_id))
+                self._remove_file(self.result_path(job))
+
+    @staticmethod
+    def _remove_file(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
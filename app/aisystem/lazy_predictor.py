@@ -0,0 +1,102 @@
+"""
+Lazily initialised predictor.
+
+Importing the views must stay cheap (server start, every manage.py command),
+so the classifier package (pandas, xgboost, shap) is only imported and the
+model bundle only loaded the first time the predictor is actually used.
+Servers call start_warm_up() to do this in the background and prime the
+model with one dummy prediction; the readiness endpoint reports progress.
+"""
+
+import threading
+import time
+
+
+class LazyPredictor:
+    """
+    Stands in for an ExoplanetPredictor built on first attribute access, so
+    the views, the job manager and the dispatcher can hold it as if it were
+    the predictor itself.
+    """
+
+    def __init__(self, **predictor_kwargs):
+        self._kwargs = predictor_kwargs
+        self._predictor = None
+        self._load_lock = threading.Lock()
+        self._warm_up_lock = threading.Lock()
+        self._warm_up_thread = None
+        self.load_seconds = None
+        self.warm_up_seconds = None
+        self.error = None
+
+    def __getattr__(self, name):
+        # Only reached for attributes the proxy itself does not have
+        return getattr(self.get(), name)
+
+    @property
+    def loaded(self):
+        return self._predictor is not None
+
+    @property
+    def ready(self):
+        return self.warm_up_seconds is not None
+
+    def get(self):
+        """Return the predictor, importing the classifier and loading the model on first use."""
+        if self._predictor is None:
+            with self._load_lock:
+                if self._predictor is None:
+                    start = time.perf_counter()
+                    from .classifier.predictor import ExoplanetPredictor
+
+                    self._predictor = ExoplanetPredictor(**self._kwargs)
+                    self.load_seconds = time.perf_counter() - start
+        return self._predictor
+
+    def preload(self):
+        """
+        Load the model and prepare the explainer without running a prediction.
+        Meant for a pre-fork server's master process: workers share the loaded
+        pages copy-on-write, and no OpenMP threads exist yet when they fork.
+        """
+        self.get().warm_up(predict=False)
+
+    def warm_up(self):
+        """Load the model if needed and run one dummy prediction through it."""
+        predictor = self.get()
+        start = time.perf_counter()
+        predictor.warm_up()
+        self.warm_up_seconds = time.perf_counter() - start
+        self.error = None
+
+    def start_warm_up(self):
+        """Run warm_up() in a background thread, unless one is already running or done."""
+        with self._warm_up_lock:
+            if self._warm_up_thread is None and not self.ready:
+                self._warm_up_thread = threading.Thread(
+                    target=self._warm_up_in_background, name='predictor-warm-up', daemon=True
+                )
+                self._warm_up_thread.start()
+
+    def _warm_up_in_background(self):
+        try:
+            self.warm_up()
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            # A failed warm-up may be retried by the next start_warm_up() call
+            with self._warm_up_lock:
+                self._warm_up_thread = None
+
+    def status(self):
+        status = {
+            "ready": self.ready,
+            "loaded": self.loaded,
+            "load_seconds": self.load_seconds,
+            "warm_up_seconds": self.warm_up_seconds,
+        }
+        if self.loaded:
+            status["model_version"] = self._predictor.model_version
+        if self.error:
+            status["error"] = self.error
+        return status
@@ -0,0 +1,227 @@
+"""
+Per-stage latency metrics.
+
+When CLASSIFY_METRICS_ENABLED is set, ServerTimingMiddleware switches on the
+classifier's stage timers (classifier/instrumentation.py), reports each
+request's stages in a Server-Timing header and feeds every stage, from any
+thread (views, micro-batch dispatcher, background jobs), into process-wide
+histograms. render_prometheus() exposes those together with the model,
+cache, micro-batching and job state in Prometheus text format (/metrics).
+When disabled, the middleware removes itself and the timers are no-ops.
+
+The histograms and the cache/micro-batching counters belong to the process
+that serves /metrics: under a multi-worker server (gunicorn.conf.py) each
+worker reports its own. Job counts are read from the shared job directory
+and cover all workers.
+"""
+
+import math
+import numbers
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .classifier import instrumentation
+from .dispatcher import Histogram
+
+
+# Upper bounds (seconds) of the stage latency buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class StageMetrics:
+    """Latency histogram and row counter per stage, shared by all threads."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._rows = {}
+
+    def observe(self, stage, seconds, rows=0):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self.buckets)
+                self._rows[stage] = 0
+            histogram.observe(seconds)
+            self._rows[stage] += rows
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                stage: (histogram.snapshot(), self._rows[stage])
+                for stage, histogram in self._histograms.items()
+            }
+
+
+stage_metrics = StageMetrics()
+request_metrics = StageMetrics()
+
+
+def server_timing_header(timings, total_seconds):
+    """Server-Timing value: one entry per stage (ms, with row counts) plus the total."""
+    entries = []
+    for name, (seconds, rows) in timings.stages.items():
+        entry = f"{name};dur={seconds * 1000:.2f}"
+        if rows:
+            entry += f';desc="{rows} rows"'
+        entries.append(entry)
+    entries.append(f"total;dur={total_seconds * 1000:.2f}")
+    return ", ".join(entries)
+
+
+class ServerTimingMiddleware:
+    """
+    Times each request, adds a Server-Timing header with the stages it ran
+    and records the request duration per route. Not installed (no per-request
+    cost at all) unless CLASSIFY_METRICS_ENABLED is set.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.CLASSIFY_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        instrumentation.configure(enabled=True, observer=stage_metrics.observe)
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with instrumentation.collect() as timings:
+            start = time.perf_counter()
+            response = self.get_response(request)
+            return self._finish(request, response, timings, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        with instrumentation.collect() as timings:
+            start = time.perf_counter()
+            response = await self.get_response(request)
+            return self._finish(request, response, timings, time.perf_counter() - start)
+
+    @staticmethod
+    def _finish(request, response, timings, seconds):
+        match = getattr(request, 'resolver_match', None)
+        # Route names, not paths, so job ids do not become label values
+        request_metrics.observe(match.url_name if match and match.url_name else 'unmatched', seconds)
+        response['Server-Timing'] = server_timing_header(timings, seconds)
+        return response
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _format_value(value):
+    # Full precision: integers as written, floats with repr (shortest exact
+    # round-trip), so large counters never collapse into 6-digit steps
+    if isinstance(value, numbers.Integral):
+        return str(int(value))
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value)
+
+
+class PrometheusText:
+    """Builds a Prometheus text exposition, one metric family at a time."""
+
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name, metric_type, help_text):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {metric_type}")
+
+    def sample(self, name, value, **labels):
+        self.lines.append(f"{name}{_labels(labels)} {_format_value(value)}")
+
+    def histogram(self, name, snapshot, **labels):
+        """Histogram samples from a dispatcher.Histogram snapshot (per-bucket counts)."""
+        cumulative = 0
+        for bound, count in snapshot['buckets'].items():
+            cumulative += count
+            self.sample(f"{name}_bucket", cumulative, **labels, le=bound)
+        self.sample(f"{name}_sum", snapshot['sum'], **labels)
+        self.sample(f"{name}_count", snapshot['count'], **labels)
+
+    def render(self):
+        return "\n".join(self.lines) + "\n"
+
+
+def render_prometheus(predictor, dispatcher, job_manager):
+    """
+    Prometheus text exposition of the stage metrics, model, prediction
+    cache, micro-batching queue and background jobs. Never loads the model:
+    model and cache metrics only appear once the predictor is loaded.
+    """
+    out = PrometheusText()
+
+    out.family('exoplanet_model_ready', 'gauge', 'Whether the model is loaded and warmed up.')
+    out.sample('exoplanet_model_ready', predictor.ready)
+    if predictor.loaded:
+        out.family('exoplanet_model_info', 'gauge', 'Loaded model bundle and backends.')
+        out.sample('exoplanet_model_info', 1, model_version=predictor.model_version,
+                   inference_backend=predictor.inference_backend,
+                   explainer_backend=predictor.explainer_backend)
+
+        cache = predictor.cache_stats()
+        out.family('exoplanet_deduplicated_rows_total', 'counter', 'Repeated rows scored only once.')
+        out.sample('exoplanet_deduplicated_rows_total', cache['deduplicated_rows'])
+        if cache.get('enabled', True):
+            for key in ('hits', 'disk_hits', 'misses', 'evictions'):
+                out.family(f'exoplanet_cache_{key}_total', 'counter', f'Prediction cache {key.replace("_", " ")}.')
+                out.sample(f'exoplanet_cache_{key}_total', cache[key])
+            out.family('exoplanet_cache_entries', 'gauge', 'Rows held in the in-memory prediction cache.')
+            out.sample('exoplanet_cache_entries', cache['size'])
+            out.family('exoplanet_cache_max_entries', 'gauge', 'Capacity of the in-memory prediction cache.')
+            out.sample('exoplanet_cache_max_entries', cache['max_entries'])
+
+    stats = dispatcher.stats()
+    out.family('exoplanet_predict_requests_total', 'counter', 'Requests queued for micro-batching.')
+    out.sample('exoplanet_predict_requests_total', stats['requests'])
+    out.family('exoplanet_predict_batches_total', 'counter', 'Batched predictor calls.')
+    out.sample('exoplanet_predict_batches_total', stats['batches'])
+    out.family('exoplanet_predict_queue_depth', 'gauge', 'Requests waiting for the dispatcher.')
+    out.sample('exoplanet_predict_queue_depth', stats['queue_depth'])
+    out.family('exoplanet_predict_queue_depth_observed', 'histogram', 'Queue depth seen by each request.')
+    out.histogram('exoplanet_predict_queue_depth_observed', stats['queue_depth_histogram'])
+    out.family('exoplanet_predict_batch_size', 'histogram', 'Records per batched predictor call.')
+    out.histogram('exoplanet_predict_batch_size', stats['batch_size_histogram'])
+
+    out.family('exoplanet_jobs', 'gauge', 'Background classification jobs by status.')
+    for job_status, count in job_manager.status_counts().items():
+        out.sample('exoplanet_jobs', count, status=job_status)
+
+    stages = stage_metrics.snapshot()
+    if stages:
+        out.family('exoplanet_stage_duration_seconds', 'histogram', 'Time spent in each classification stage.')
+        for stage, (snapshot, _) in stages.items():
+            out.histogram('exoplanet_stage_duration_seconds', snapshot, stage=stage)
+        out.family('exoplanet_stage_rows_total', 'counter', 'Rows processed by each classification stage.')
+        for stage, (_, rows) in stages.items():
+            out.sample('exoplanet_stage_rows_total', rows, stage=stage)
+
+    requests = request_metrics.snapshot()
+    if requests:
+        out.family('exoplanet_http_request_duration_seconds', 'histogram', 'Request duration per route.')
+        for route, (snapshot, _) in requests.items():
+            out.histogram('exoplanet_http_request_duration_seconds', snapshot, route=route)
+
+    return out.render()
@@ -0,0 +1,20 @@
+from rest_framework.parsers import FileUploadParser
+
+
+class ArrowFileParser(FileUploadParser):
+    """
+    Raw Arrow IPC request body (file format, a.k.a. Feather v2). The body goes
+    through Django's upload handlers like a multipart upload (memory, or a
+    spooled temp file when large) and is exposed as request.data['file'].
+    """
+    media_type = 'application/vnd.apache.arrow.file'
+    default_filename = 'upload.arrow'
+
+    def get_filename(self, stream, media_type, parser_context):
+        # A Content-Disposition filename is optional: the format is sniffed
+        return super().get_filename(stream, media_type, parser_context) or self.default_filename
+
+
+class ArrowStreamParser(ArrowFileParser):
+    """Raw Arrow IPC request body in the streaming format."""
+    media_type = 'application/vnd.apache.arrow.stream'
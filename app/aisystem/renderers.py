@@ -0,0 +1,46 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline-delimited JSON. Streamed classify responses are produced by the
+    view itself; this renderer lets clients negotiate the format with an
+    Accept header and renders non-streamed bodies (e.g. errors) as one line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return (json.dumps(data) + '\n').encode(self.charset)
+
+
+class ArrowIPCRenderer(BaseRenderer):
+    """
+    Arrow IPC file format (Feather v2). Views hand over the results DataFrame
+    itself, so floats are written as-is instead of being formatted as text.
+    Other bodies (e.g. errors) become a one-row table of their fields.
+    """
+    media_type = 'application/vnd.apache.arrow.file'
+    format = 'arrow'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        import pandas as pd
+        import pyarrow as pa
+
+        if data is None:
+            return b''
+        if not isinstance(data, pd.DataFrame):
+            data = pd.DataFrame([{key: str(value) for key, value in data.items()}])
+
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
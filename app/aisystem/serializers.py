@@ -1,4 +1,13 @@
 from rest_framework import serializers
 
 class ExoplanetFileUploadSerializer(serializers.Serializer):
-    file = serializers.FileField()
\ No newline at end of file
+    file = serializers.FileField()
+    explanation = serializers.ChoiceField(choices=['none', 'topk', 'full'], default='topk')
+    top_k = serializers.IntegerField(min_value=1, default=3)
+
+class ExoplanetJobSerializer(ExoplanetFileUploadSerializer):
+    format = serializers.ChoiceField(choices=['csv', 'xlsx', 'parquet', 'arrow'], default='csv')
+
+class ExoplanetPredictSerializer(serializers.Serializer):
+    explanation = serializers.ChoiceField(choices=['none', 'topk', 'full'], default='topk')
+    top_k = serializers.IntegerField(min_value=1, default=10)
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'aisystem.metrics.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -78,6 +81,54 @@ TEMPLATES = [
 WSGI_APPLICATION = 'aisystem.wsgi.application'
 
 
+# Exoplanet classifier
+
+# Processes used to classify large batches in parallel (1 = in-process only)
+CLASSIFY_PROCESS_WORKERS = int(os.environ.get('CLASSIFY_PROCESS_WORKERS', 1))
+
+# SHAP contributions backend: 'shap' (shap.TreeExplainer) or 'xgboost' (native pred_contribs)
+CLASSIFY_EXPLAINER_BACKEND = os.environ.get('CLASSIFY_EXPLAINER_BACKEND', 'shap')
+
+# Probability backend: 'xgboost' (native runtime) or 'numpy' (flattened tree tables)
+CLASSIFY_INFERENCE_BACKEND = os.environ.get('CLASSIFY_INFERENCE_BACKEND', 'xgboost')
+
+# Threads per XGBoost call (0 = all cores). With several server workers on one
+# host, give each a share of the cores (gunicorn.conf.py sets this per worker)
+CLASSIFY_XGBOOST_THREADS = int(os.environ.get('CLASSIFY_XGBOOST_THREADS', 0))
+
+# Threads running /api/classify/ requests; async servers hand the CPU work to
+# this bounded pool instead of blocking the event loop
+CLASSIFY_EXECUTOR_WORKERS = int(os.environ.get('CLASSIFY_EXECUTOR_WORKERS', 2))
+
+# Row-level prediction cache: LRU entries in memory, plus an optional SQLite file
+CLASSIFY_CACHE_SIZE = int(os.environ.get('CLASSIFY_CACHE_SIZE', 100_000))
+CLASSIFY_CACHE_PATH = os.environ.get('CLASSIFY_CACHE_PATH') or None
+
+# Load the model and run one dummy prediction in the background when the
+# WSGI/ASGI application starts (readiness is reported by /api/ready/)
+CLASSIFY_WARM_UP_ON_START = os.environ.get('CLASSIFY_WARM_UP_ON_START', '1').lower() in ('1', 'true', 'yes')
+
+# Per-stage timers: Server-Timing response header and stage histograms in
+# /metrics. Off by default; when off the timers cost a flag check per stage
+CLASSIFY_METRICS_ENABLED = os.environ.get('CLASSIFY_METRICS_ENABLED', '0').lower() in ('1', 'true', 'yes')
+
+# Largest list of KOIs accepted by the JSON endpoint (/api/predict/)
+CLASSIFY_PREDICT_MAX_RECORDS = 100
+
+# Micro-batching of concurrent /api/predict/ calls: a batch is run once the
+# window (ms) after its first request closes or it holds CLASSIFY_BATCH_MAX_SIZE rows
+CLASSIFY_BATCH_WINDOW_MS = float(os.environ.get('CLASSIFY_BATCH_WINDOW_MS', 2))
+CLASSIFY_BATCH_MAX_SIZE = int(os.environ.get('CLASSIFY_BATCH_MAX_SIZE', 64))
+
+# Rows classified per chunk when /api/classify/ streams NDJSON (?stream=1)
+CLASSIFY_STREAM_CHUNK_SIZE = 5000
+
+# Background classification jobs (/api/jobs/)
+CLASSIFY_JOB_DIR = Path(tempfile.gettempdir()) / 'exoplanet_jobs'
+CLASSIFY_JOB_WORKERS = 2
+CLASSIFY_JOB_TTL_SECONDS = 60 * 60
+
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
@@ -16,9 +16,17 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path
-from .views import classify_view
+from .views import classify_view, predict_view, job_submit_view, job_status_view, download_results_view, cache_stats_view, dispatcher_stats_view, ready_view, metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/classify/', classify_view, name='classify'),
+    path('api/predict/', predict_view, name='predict'),
+    path('api/predict/stats/', dispatcher_stats_view, name='predict-stats'),
+    path('api/jobs/', job_submit_view, name='job-submit'),
+    path('api/jobs/<str:job_id>/', job_status_view, name='job-status'),
+    path('download-results/<str:filename>', download_results_view, name='download-results'),
+    path('api/cache/stats/', cache_stats_view, name='cache-stats'),
+    path('api/ready/', ready_view, name='ready'),
+    path('metrics', metrics_view, name='metrics'),
 ]
@@ -1,50 +1,305 @@
-from rest_framework.decorators import api_view, parser_classes
-from rest_framework.parsers import MultiPartParser
+from rest_framework.decorators import api_view, parser_classes, renderer_classes
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.renderers import JSONRenderer, BrowsableAPIRenderer
 from rest_framework.response import Response
 from rest_framework import status
-from .serializers import ExoplanetFileUploadSerializer
-from .classifier.predictor import ExoplanetPredictor  # Import the predictor
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+from .serializers import ExoplanetFileUploadSerializer, ExoplanetJobSerializer, ExoplanetPredictSerializer
+from .renderers import NDJSONRenderer, ArrowIPCRenderer
+from .parsers import ArrowFileParser, ArrowStreamParser
+from .jobs import JobManager, RESULT_FORMATS, DONE
+from .dispatcher import MicroBatchDispatcher
+from .lazy_predictor import LazyPredictor
+from .metrics import PROMETHEUS_CONTENT_TYPE, render_prometheus
+from .classifier.instrumentation import stage
 
+import asyncio
+import contextvars
 import csv
 import io
-import pandas as pd
-import os
-import tempfile
+import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
 
 
-# Initialize the predictor (paths adjusted to Docker)
-predictor = ExoplanetPredictor(
-    model_path='/app/aisystem/classifier/xgboost_grid_best_model1.joblib',
-    training_data_path='/app/aisystem/classifier/datasets/selected_features_exoplanets.csv'
+# Predictor for the self-contained model bundle (path adjusted to Docker). The
+# classifier is imported and the model loaded on first use (or by the warm-up
+# started from wsgi/asgi), so importing the views stays cheap
+predictor = LazyPredictor(
+    bundle_path='/app/aisystem/classifier/model_bundle',
+    n_workers=settings.CLASSIFY_PROCESS_WORKERS,
+    explainer_backend=settings.CLASSIFY_EXPLAINER_BACKEND,
+    inference_backend=settings.CLASSIFY_INFERENCE_BACKEND,
+    cache_size=settings.CLASSIFY_CACHE_SIZE,
+    cache_path=settings.CLASSIFY_CACHE_PATH,
+    n_threads=settings.CLASSIFY_XGBOOST_THREADS
+)
+
+# Background worker pool for uploads classified as jobs
+job_manager = JobManager(
+    predictor,
+    job_dir=settings.CLASSIFY_JOB_DIR,
+    max_workers=settings.CLASSIFY_JOB_WORKERS,
+    ttl_seconds=settings.CLASSIFY_JOB_TTL_SECONDS,
+    chunksize=settings.CLASSIFY_STREAM_CHUNK_SIZE,
+)
 
+# Coalesces concurrent /api/predict/ calls into batched predictor calls
+dispatcher = MicroBatchDispatcher(
+    predictor,
+    max_batch_size=settings.CLASSIFY_BATCH_MAX_SIZE,
+    window_ms=settings.CLASSIFY_BATCH_WINDOW_MS,
 )
 
+# Bounded pool for the CPU-heavy part of /api/classify/ (threads start on
+# first use, so nothing is spawned before a pre-fork server forks)
+classify_executor = ThreadPoolExecutor(
+    max_workers=settings.CLASSIFY_EXECUTOR_WORKERS,
+    thread_name_prefix='classify',
+)
+
+
+def run_in_executor(view):
+    """
+    Serve a DRF view as an async view whose body runs in classify_executor:
+    under ASGI the event loop is never blocked and at most
+    CLASSIFY_EXECUTOR_WORKERS uploads are classified at once per process.
+    """
+    @csrf_exempt
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        def call():
+            response = view(request, *args, **kwargs)
+            # Render here as well, so serialising large results stays off the event loop
+            if hasattr(response, 'render'):
+                with stage('serialize'):
+                    response.render()
+            return response
+
+        # Carry the request's context (its stage timings) into the pool thread
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(classify_executor, context.run, call)
+
+    return async_view
+
+
+async def iterate_in_executor(iterator):
+    """Async iterator that pulls each item of a blocking iterator in classify_executor."""
+    loop = asyncio.get_running_loop()
+    done = object()
+    while True:
+        item = await loop.run_in_executor(classify_executor, partial(next, iterator, done))
+        if item is done:
+            return
+        yield item
+
+
+def wants_ndjson(request):
+    """Streaming is opt-in: ?stream=1 or an Accept header asking for NDJSON."""
+    if request.query_params.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return request.accepted_renderer.format == NDJSONRenderer.format
+
+
+def summary_payload(stats):
+    """Final NDJSON record built from ExoplanetPredictor.summarize_results stats."""
+    return {
+        "total": stats['total'],
+        "success": stats['total'] - stats['errors'],
+        "errors": stats['errors'],
+        "distribution": dict(stats['label_counts']),
+    }
+
+
+def stream_ndjson_results(uploaded_file, chunksize, explanation, top_k):
+    """
+    Yield one JSON line per classified row as each chunk finishes, then a
+    final {"summary": ...} line.
+    """
+    stats = None
+    try:
+        for results_chunk in predictor.predict_batch_chunks(
+                uploaded_file, chunksize=chunksize, explanation=explanation, top_k=top_k):
+            stats = predictor.summarize_results(results_chunk, stats)
+            yield results_chunk.to_json(orient='records', lines=True).rstrip('\n') + '\n'
+
+        if stats is None:
+            stats = {'total': 0, 'errors': 0, 'label_counts': {}}
+        yield json.dumps({"summary": summary_payload(stats)}) + '\n'
+    except Exception as e:
+        # Headers are already sent, so report the failure in-band
+        yield json.dumps({"error": str(e)}) + '\n'
+
+
+@run_in_executor
 @api_view(['POST'])
-@parser_classes([MultiPartParser])
+@parser_classes([MultiPartParser, ArrowFileParser, ArrowStreamParser])
+@renderer_classes([JSONRenderer, BrowsableAPIRenderer, NDJSONRenderer, ArrowIPCRenderer])
 def classify_view(request):
-    serializer = ExoplanetFileUploadSerializer(data=request.data)
+    # Raw Arrow IPC bodies carry no form fields, so options may also be sent
+    # as query params (form fields win)
+    with stage('upload'):
+        form = dict(request.data.items())
+    serializer = ExoplanetFileUploadSerializer(data={**request.query_params.dict(), **form})
     if serializer.is_valid():
+        # The upload is parsed in place (memory, or Django's own spooled temp
+        # file for large uploads); the format is sniffed from its content
         uploaded_file = serializer.validated_data['file']
-        filename = uploaded_file.name.lower()
+        explanation = serializer.validated_data['explanation']
+        top_k = serializer.validated_data['top_k']
 
-        try:
-            # Save uploaded file to a temporary location
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as temp_file:
-                temp_file.write(uploaded_file.read())
-                temp_file_path = temp_file.name
+        if wants_ndjson(request):
+            # The upload stays open until the response has been fully sent
+            lines = stream_ndjson_results(uploaded_file, settings.CLASSIFY_STREAM_CHUNK_SIZE, explanation, top_k)
+            if isinstance(request._request, ASGIRequest):
+                # ASGI would otherwise buffer a blocking iterator before sending it
+                lines = iterate_in_executor(lines)
+            return StreamingHttpResponse(lines, content_type=NDJSONRenderer.media_type)
 
+        try:
             # Run batch prediction
-            results_df = predictor.predict_batch(input_file=temp_file_path)
+            results_df = predictor.predict_batch(
+                input_file=uploaded_file, explanation=explanation, top_k=top_k
+            )
 
-            # Convert results to JSON
-            results_json = results_df.to_dict(orient='records')
+            # Arrow clients get the table itself, without a JSON round-trip
+            if request.accepted_renderer.format == ArrowIPCRenderer.format:
+                return Response(results_df, status=status.HTTP_200_OK)
 
-            # Clean up temporary file
-            os.remove(temp_file_path)
+            # Convert results to JSON
+            with stage('serialize', len(results_df)):
+                results_json = results_df.to_dict(orient='records')
 
             return Response({"results": results_json}, status=status.HTTP_200_OK)
 
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['POST'])
+@parser_classes([JSONParser])
+def predict_view(request):
+    """
+    Classify KOIs sent as JSON, in memory and without touching the disk.
+    The body is one feature dict (returns one result) or a short list of
+    them (returns {"results": [...]}); explanation/top_k are query params.
+    """
+    serializer = ExoplanetPredictSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    with stage('upload'):
+        body = request.data
+    single = isinstance(body, dict)
+    records = [body] if single else body
+    if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+        return Response({"error": "Expected a JSON object or a list of objects"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if len(records) > settings.CLASSIFY_PREDICT_MAX_RECORDS:
+        return Response({"error": f"At most {settings.CLASSIFY_PREDICT_MAX_RECORDS} records per request"},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        # Queue wait plus the batched predictor call
+        with stage('dispatch', len(records)):
+            results = dispatcher.predict(
+                records,
+                explanation=serializer.validated_data['explanation'],
+                top_k=serializer.validated_data['top_k']
+            )
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    return Response(results[0] if single else {"results": results}, status=status.HTTP_200_OK)
+
+
+def job_payload(request, job):
+    """Status/progress body shared by the job endpoints."""
+    payload = {
+        "job_id": job.job_id,
+        "status": job.status,
+        "rows_done": job.rows_done,
+        "rows_total": job.rows_total,
+        "progress": job.rows_done / job.rows_total if job.rows_total else None,
+        "status_url": request.build_absolute_uri(f"/api/jobs/{job.job_id}/"),
+    }
+    if job.status == DONE:
+        payload["filename"] = job.result_filename
+        payload["download_url"] = request.build_absolute_uri(f"/download-results/{job.result_filename}")
+        payload["summary"] = summary_payload(job.stats)
+    if job.error:
+        payload["error"] = job.error
+    return payload
+
+
+@api_view(['POST'])
+@parser_classes([MultiPartParser])
+def job_submit_view(request):
+    serializer = ExoplanetJobSerializer(data=request.data)
+    if serializer.is_valid():
+        job = job_manager.submit(
+            serializer.validated_data['file'],
+            result_format=serializer.validated_data['format'],
+            explanation=serializer.validated_data['explanation'],
+            top_k=serializer.validated_data['top_k']
+        )
+        return Response(job_payload(request, job), status=status.HTTP_202_ACCEPTED)
+
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+def job_status_view(request, job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(job_payload(request, job), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def download_results_view(request, filename):
+    job = job_manager.get_by_filename(filename)
+    if job is None:
+        return Response({"error": "Results not found"}, status=status.HTTP_404_NOT_FOUND)
+    return FileResponse(
+        open(job_manager.result_path(job), 'rb'),
+        as_attachment=True,
+        filename=f"exoplanet_results.{job.result_format}",
+        content_type=RESULT_FORMATS[job.result_format]
+    )
+
+
+@api_view(['GET'])
+def cache_stats_view(request):
+    return Response(predictor.cache_stats(), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def dispatcher_stats_view(request):
+    return Response(dispatcher.stats(), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def ready_view(request):
+    """200 once the model is loaded and warmed up; otherwise start warming up and answer 503."""
+    if predictor.ready:
+        return Response(predictor.status(), status=status.HTTP_200_OK)
+    predictor.start_warm_up()
+    return Response(predictor.status(), status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+@require_GET
+def metrics_view(request):
+    """Prometheus text exposition (stage latencies, model, cache, queue and job state)."""
+    return HttpResponse(render_prometheus(predictor, dispatcher, job_manager),
+                        content_type=PROMETHEUS_CONTENT_TYPE)
@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'aisystem.settings')
 
 application = get_wsgi_application()
+
+# Load the model in the background so the first request does not pay for it
+if settings.CLASSIFY_WARM_UP_ON_START:
+    from aisystem.views import predictor
+
+    predictor.start_warm_up()
@@ -0,0 +1,63 @@
+"""
+Gunicorn configuration for production serving (read from the working
+directory, /app in the Docker image):
+
+    gunicorn aisystem.wsgi:application
+
+The app is preloaded: the master process imports Django, loads the model
+bundle and builds the SHAP explainer once, then forks the workers, which
+share those pages copy-on-write instead of each loading its own copy. Each
+worker runs one dummy prediction before it starts accepting requests.
+
+Background job state lives in CLASSIFY_JOB_DIR, so any worker can answer a
+job's status and download requests. Everything else the app counts stays in
+each worker's memory: /metrics (stage latencies, cache and micro-batching
+counters), /api/cache/stats/ and /api/predict/stats/ describe only the
+worker that served the request, and successive scrapes may hit different
+workers. Run with GUNICORN_WORKERS=1 (and more GUNICORN_THREADS) when those
+numbers must cover the whole server; the exoplanet_jobs gauge is already
+server-wide.
+
+Environment:
+    GUNICORN_BIND       address to listen on (default 0.0.0.0:8000)
+    GUNICORN_WORKERS    worker processes (default: one per core)
+    GUNICORN_THREADS    request threads per worker (default 4)
+    GUNICORN_TIMEOUT    seconds before a silent worker is restarted (default 120)
+    CLASSIFY_XGBOOST_THREADS   XGBoost threads per worker (default: cores / workers)
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+preload_app = True
+
+# Split the cores between workers instead of every worker's XGBoost calls
+# starting one thread per core
+os.environ.setdefault('CLASSIFY_XGBOOST_THREADS', str(max(1, multiprocessing.cpu_count() // workers)))
+
+# The hooks below load and warm up the model; the background warm-up thread
+# started by wsgi.py would not survive the fork
+os.environ['CLASSIFY_WARM_UP_ON_START'] = '0'
+
+
+def when_ready(server):
+    # Master process, app already imported, before the first fork. No
+    # prediction here: fork with OpenMP threads running can hang the workers
+    from aisystem.views import predictor
+
+    predictor.preload()
+    server.log.info("Model %s loaded in %.2fs (%d workers, %s XGBoost threads each)",
+                    predictor.model_version, predictor.load_seconds, workers,
+                    os.environ['CLASSIFY_XGBOOST_THREADS'])
+
+
+def post_fork(server, worker):
+    from aisystem.views import predictor
+
+    predictor.warm_up()
+    server.log.info("Worker %s warmed up in %.2fs", worker.pid, predictor.warm_up_seconds)
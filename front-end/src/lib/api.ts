@@ -16,4 +16,74 @@ export async function classifyExoplanetFile(file: File): Promise<any> {
 
   const result = await response.json();
   return result.results;
-}
\ No newline at end of file
+}
+
+// Classifies a single KOI (a feature dict) in memory via /predict/. Missing
+// features may be omitted or null; they are imputed with the training medians.
+export async function predictExoplanet(
+  features: Record<string, number | null>,
+  explanation: 'none' | 'topk' | 'full' = 'topk',
+  topK = 10
+): Promise<any> {
+  const params = new URLSearchParams({ explanation, top_k: String(topK) });
+  const response = await fetch(`${API_BASE}/predict/?${params}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(features)
+  });
+
+  if (!response.ok) {
+    const error = await response.json();
+    throw new Error(error?.error || 'Failed to classify exoplanet');
+  }
+
+  return response.json();
+}
+
+// Background jobs: submit the upload, poll its status, download the results file.
+export async function submitClassificationJob(file: File, format = 'csv'): Promise<any> {
+  const formData = new FormData();
+  formData.append('file', file);
+  formData.append('format', format);
+
+  const response = await fetch(`${API_BASE}/jobs/`, {
+    method: 'POST',
+    body: formData
+  });
+
+  if (!response.ok) {
+    const error = await response.json();
+    throw new Error(error?.error || 'Failed to submit file');
+  }
+
+  return response.json();
+}
+
+export async function getClassificationJob(jobId: string): Promise<any> {
+  const response = await fetch(`${API_BASE}/jobs/${jobId}/`);
+
+  if (!response.ok) {
+    const error = await response.json();
+    throw new Error(error?.error || 'Failed to fetch job status');
+  }
+
+  return response.json();
+}
+
+export async function waitForClassificationJob(
+  file: File,
+  onProgress?: (job: any) => void,
+  intervalMs = 1000
+): Promise<any> {
+  let job = await submitClassificationJob(file);
+  while (job.status === 'queued' || job.status === 'running') {
+    onProgress?.(job);
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    job = await getClassificationJob(job.job_id);
+  }
+
+  if (job.status === 'failed') {
+    throw new Error(job.error || 'Classification job failed');
+  }
+  return job;
+}